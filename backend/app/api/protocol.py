@@ -0,0 +1,51 @@
+from typing import Tuple
+import numpy as np
+import struct
+
+# Binary WebSocket messages carry raw media instead of base64 inside JSON:
+#   byte 0      message type (see MESSAGE_TYPES)
+#   bytes 1-8   client timestamp in seconds, little-endian float64
+#   bytes 9-    payload (JPEG frame, recorded audio or live PCM)
+HEADER = struct.Struct("<Bd")
+
+# Live PCM payloads start with the sample rate as a little-endian uint32,
+# followed by mono 16-bit little-endian samples
+PCM_HEADER = struct.Struct("<I")
+
+FRAME = 1
+AUDIO = 2
+AUDIO_PCM = 3
+
+MESSAGE_TYPES = {
+    FRAME: "frame",
+    AUDIO: "audio_complete",
+    AUDIO_PCM: "audio_pcm",
+}
+
+
+def parse_binary_message(data: bytes) -> Tuple[str, float, memoryview]:
+    """Split a binary message into its type, timestamp and a zero-copy view of the payload"""
+    if len(data) < HEADER.size:
+        raise ValueError("Binary message is shorter than its header")
+
+    type_id, timestamp = HEADER.unpack_from(data)
+    if type_id not in MESSAGE_TYPES:
+        raise ValueError(f"Unknown binary message type: {type_id}")
+
+    return MESSAGE_TYPES[type_id], timestamp, memoryview(data)[HEADER.size:]
+
+
+def parse_pcm_payload(payload: memoryview) -> Tuple[int, np.ndarray]:
+    """Return the sample rate and float32 samples in [-1, 1] of a live PCM payload"""
+    if len(payload) < PCM_HEADER.size:
+        raise ValueError("PCM payload is shorter than its header")
+
+    (sample_rate,) = PCM_HEADER.unpack_from(payload)
+    if sample_rate <= 0:
+        raise ValueError("PCM payload has an invalid sample rate")
+
+    samples = payload[PCM_HEADER.size:]
+    if len(samples) % 2:
+        raise ValueError("PCM payload has an incomplete sample")
+
+    return sample_rate, np.frombuffer(samples, dtype="<i2").astype(np.float32) / 32768.0
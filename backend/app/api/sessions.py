@@ -0,0 +1,84 @@
+from typing import Awaitable, Callable, Dict, Optional
+import json
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
+
+from app.api.websocket import manager
+from app.models.session import AsyncSessionModel
+
+router = APIRouter(prefix="/api/sessions", tags=["sessions"])
+
+
+def session_detail(session) -> Dict:
+    """Every column of a saved session, JSON-ready"""
+    detail = {column.name: getattr(session, column.name) for column in session.__table__.columns}
+    detail["created_at"] = session.created_at.isoformat() if session.created_at else None
+    return detail
+
+
+async def cached_json(request: Request, build: Callable[[], Awaitable]) -> Response:
+    """Serve `build()` as JSON through the history cache, honouring If-None-Match.
+
+    Clients that poll send back the ETag they got; while no session has been
+    written since, they get a 304 without the database being touched.
+    """
+    cache = manager.history_cache
+    key = f"{request.url.path}?{request.url.query}"
+
+    cached = cache.get(key)
+    if cached is None:
+        version = cache.version
+        body = json.dumps(await build()).encode("utf-8")
+        etag = cache.put(key, body, version)
+    else:
+        body, etag = cached
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("")
+async def list_sessions(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    topic_id: Optional[int] = None,
+    dominant_emotion: Optional[str] = None
+):
+    """Session summaries, newest first; pass `next_cursor` back as `cursor` for the next page"""
+    async def build():
+        try:
+            return await AsyncSessionModel.get_session_summaries(limit, cursor, topic_id, dominant_emotion)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return await cached_json(request, build)
+
+
+@router.get("/stats")
+async def session_stats(request: Request, days: int = Query(30, ge=1, le=365)):
+    """Overall, per-topic and per-day averages"""
+    async def build():
+        return {
+            "overall": await AsyncSessionModel.get_user_stats(),
+            "by_topic": await AsyncSessionModel.get_topic_stats(),
+            "daily": await AsyncSessionModel.get_daily_stats(days)
+        }
+
+    return await cached_json(request, build)
+
+
+@router.get("/{session_id}")
+async def get_session(request: Request, session_id: str):
+    """A saved session with its transcript, analysis and feedback"""
+    async def build():
+        session = await AsyncSessionModel.get_session(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return session_detail(session)
+
+    return await cached_json(request, build)
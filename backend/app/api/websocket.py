@@ -3,10 +3,10 @@ import json
 import base64
 import numpy as np
 import cv2
-from PIL import Image
-from io import BytesIO
-from typing import Dict
+from typing import Dict, Optional, Union
 from datetime import datetime
+import time
+import uuid
 
 
 def sanitize(obj):
@@ -24,23 +24,87 @@ def sanitize(obj):
     if isinstance(obj, np.bool_):
         return bool(obj)
     return obj
-from app.services.emotion_service import EmotionService
+from app.services.emotion_service import EmotionService, load_models
 from app.services.chat_service import ChatService
 from app.services.speech_service import SpeechService
 from app.services.topic_service import TopicService
 from app.services.voice_analysis_service import VoiceAnalysisService
-from app.models.session import SessionModel
+from app.services.inference_pool import InferencePool
+from app.services.emotion_batcher import EmotionBatcher
+from app.services.frame_rate_controller import FrameRateController
+from app.services.recording_buffer import RecordingBuffer
+from app.services.session_store import SessionStore
+from app.services.emotion_timeline import EmotionTimeline
+from app.services.persistence_queue import PersistenceQueue
+from app.services.history_cache import HistoryCache
+from app.api.protocol import parse_pcm_payload
+from app.config import config
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+
+# cv2.imdecode flags for each supported FRAME_DECODE_SCALE
+FRAME_DECODE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
-        self.session_data: Dict[str, dict] = {}
+        self.session_data = SessionStore(
+            idle_ttl=config.SESSION_IDLE_TTL,
+            max_sessions=config.MAX_SESSIONS,
+            on_evict=self.evict_session
+        )
     
         self.emotion_service = EmotionService()
         self.chat_service = ChatService()
         self.speech_service = SpeechService()
         self.topic_service = TopicService()
         self.voice_service = VoiceAnalysisService()
+        self.inference_pool = InferencePool(
+            max_workers=config.INFERENCE_WORKERS,
+            queue_size=config.FRAME_QUEUE_SIZE,
+            kind=config.INFERENCE_EXECUTOR
+        )
+        self.emotion_batcher = EmotionBatcher(
+            self.inference_pool.executor,
+            self.emotion_service.classify_faces,
+            max_batch_size=config.EMOTION_BATCH_SIZE,
+            max_wait=config.EMOTION_BATCH_WAIT_MS / 1000.0
+        )
+        self.frame_rate_controller = FrameRateController(
+            default_interval=config.FRAME_PROCESS_INTERVAL,
+            min_interval=config.FRAME_INTERVAL_MIN,
+            max_interval=config.FRAME_INTERVAL_MAX
+        )
+        self.analysis_executor = ThreadPoolExecutor(
+            max_workers=config.ANALYSIS_WORKERS,
+            thread_name_prefix="analysis"
+        )
+        self.history_cache = HistoryCache(max_entries=config.HISTORY_CACHE_SIZE)
+        self.persistence_queue = PersistenceQueue(
+            batch_size=config.PERSIST_BATCH_SIZE,
+            flush_interval=config.PERSIST_FLUSH_INTERVAL,
+            journal_path=config.PERSIST_JOURNAL_PATH,
+            on_write=self.history_cache.invalidate
+        )
+        self._background_tasks = set()
+        self._session_tasks: Dict[str, set] = {}  # session_id -> running handlers, cancelled on disconnect
+        self.models_ready = False
+
+    async def warm_up_models(self):
+        """Load the face detector and emotion model on every inference worker"""
+        try:
+            await self.inference_pool.warm_up(load_models)
+            self.models_ready = True
+            print("Emotion models loaded and warmed up.")
+        except Exception as e:
+            print(f"Error warming up emotion models: {str(e)}")
 
     async def connect(self, session_id: str, websocket: WebSocket):
         await websocket.accept()
@@ -52,14 +116,17 @@ class ConnectionManager:
         self.session_data[session_id] = {
             "start_time": datetime.now(),
             "frame_count": 0,
-            "emotions": [],
+            "emotions": self.new_emotion_timeline(),
             "faces_detected": 0,
+            "face_track": None,
             "audio_chunks": [],
-            "chat_history": [],
+            "chat_history": deque(maxlen=config.MAX_CHAT_MESSAGES),
             "topic": topic,
             "recording_state": "idle",  # idle, recording, processing
             "recording_start_time": None,
-            "audio_data": bytearray()
+            "recording_id": None,  # Key of the current debate's database row
+            "recording": None,
+            "voice_stream": None
         }
         
         print(f"Session {session_id} connected.")
@@ -70,6 +137,13 @@ class ConnectionManager:
             "topic": topic
         })
 
+        # Tell the client how often to send frames; adjusted later as load changes
+        await self.send_message(session_id, {
+            "type": "frame_rate",
+            "interval": self.frame_rate_controller.start(session_id),
+            "drop_while_busy": True
+        })
+
         # Send welcome message
         welcome = (
             "Welcome to Polly AI — your personal debate coach!\n\n"
@@ -87,80 +161,176 @@ class ConnectionManager:
             "timestamp": datetime.now().isoformat()
         })
     
+    def new_emotion_timeline(self) -> EmotionTimeline:
+        return EmotionTimeline(self.emotion_service.emotions, max_samples=config.MAX_EMOTION_SAMPLES)
+
+    def new_recording_buffer(self) -> RecordingBuffer:
+        return RecordingBuffer(
+            spill_threshold=config.RECORDING_SPILL_BYTES,
+            max_size=config.MAX_RECORDING_BYTES,
+            directory=config.RECORDING_DIR
+        )
+
+    def release_recording(self, session: dict):
+        if session.get("recording") is not None:
+            session["recording"].close()
+            session["recording"] = None
+
     def disconnect(self, session_id: str):
         if session_id in self.active_connections:
             del self.active_connections[session_id]
         if session_id in self.session_data:
+            self.release_recording(self.session_data[session_id])
             del self.session_data[session_id]
+        for task in self._session_tasks.pop(session_id, ()):
+            task.cancel()
+        self.inference_pool.discard(session_id)
+        self.frame_rate_controller.discard(session_id)
         self.chat_service.clear_history(session_id)
         print(f"Session {session_id} disconnected.")
+
+    def evict_session(self, session_id: str, session: dict, reason: str):
+        """Called by the session store when it drops an idle or excess session"""
+        self.release_recording(session)
+        websocket = self.active_connections.get(session_id)
+        self.disconnect(session_id)
+        if websocket is not None:
+            self.run_in_background(self.close_evicted(websocket, reason))
+
+    async def close_evicted(self, websocket: WebSocket, reason: str):
+        message = ("Session expired after a period of inactivity." if reason == "idle"
+                   else "The server is at capacity and closed your session.")
+        try:
+            await websocket.send_json({"type": "error", "message": f"{message} Refresh the page to start again."})
+            await websocket.close(code=1001)
+        except Exception as e:
+            print(f"Error closing evicted session: {str(e)}")
+
+    def session_stats(self) -> dict:
+        """Session store stats with each session's chat history counted in its memory"""
+        stats = self.session_data.stats()
+        usage = stats["memory_bytes_by_session"]
+        for session_id, size in self.chat_service.history_bytes().items():
+            if session_id in usage:
+                usage[session_id] += size
+        stats["memory_bytes"] = sum(usage.values())
+        return stats
     
     async def send_message(self, session_id: str, message: dict):
         if session_id in self.active_connections:
             await self.active_connections[session_id].send_json(sanitize(message))
         
-    def base64_to_image(self, base64_str: str) -> np.ndarray:
-        if ',' in base64_str:
-            base64_str = base64_str.split(',')[1]
-        
-        img_data = base64.b64decode(base64_str)
-        image = Image.open(BytesIO(img_data))
-        img_array = np.array(image)
-        img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-        return img_bgr
+    async def send_partial(self, session_id: str, stage: str, data: dict):
+        """Send one finished piece of the post-recording report ahead of analysis_complete"""
+        await self.send_message(session_id, {
+            "type": "analysis_partial",
+            "stage": stage,
+            "data": data
+        })
+
+    def decode_frame(self, frame_data: Union[str, bytes, memoryview]) -> np.ndarray:
+        """Decode a JPEG frame straight to the grayscale image the emotion pipeline works on.
+
+        Binary frames are decoded in place from the received buffer. With
+        FRAME_DECODE_SCALE > 1 the JPEG decoder downsamples while decoding.
+        """
+        if isinstance(frame_data, str):
+            if ',' in frame_data:
+                frame_data = frame_data.split(',')[1]
+            frame_data = base64.b64decode(frame_data)
+
+        flags = FRAME_DECODE_FLAGS.get(config.FRAME_DECODE_SCALE, cv2.IMREAD_GRAYSCALE)
+        frame = cv2.imdecode(np.frombuffer(frame_data, dtype=np.uint8), flags)
+        if frame is None:
+            raise ValueError("Could not decode frame")
+        return frame
+
+    async def process_frame(self, session_id: str, frame_data: Union[str, bytes, memoryview], timestamp: float):
+        """Decode a frame and queue it for emotion analysis without blocking the socket"""
+        if session_id not in self.session_data:
+            return
 
-    async def process_frame(self, session_id: str, frame_data: str, timestamp: float):
         try:
-            frame = self.base64_to_image(frame_data)
-            result = self.emotion_service.analyze_frame(frame)
-            
-            if result is None:
-                result = {
-                    'emotions': None,
-                    'dominant_emotion': None,
-                    'confidence': 0.0,
-                    'face_detected': False,
-                    'bounding_box': None,
-                    'timestamp': datetime.now().isoformat()
-                }
-            
-            if session_id in self.session_data:
-                self.session_data[session_id]["frame_count"] += 1
-                if result.get("face_detected"):
-                    self.session_data[session_id]["emotions"].append(result)
-            
-            await self.send_message(session_id, {
-                "type": "emotion_update",
-                "data": result,
-                "frame_number": self.session_data[session_id].get("frame_count", 0)
-            })
-            
-            return result
-            
+            frame = self.decode_frame(frame_data)
         except Exception as e:
             print(f"Error processing frame: {str(e)}")
-            error_result = {
-                'emotions': None,
-                'dominant_emotion': None,
-                'confidence': 0.0,
-                'face_detected': False,
-                'bounding_box': None,
-                'timestamp': datetime.now().isoformat()
-            }
+            await self.send_emotion_update(session_id, None)
+            return
+
+        # Stale frames are dropped by the pool if this session is still busy.
+        # The face track is read at dispatch, after the previous frame's result updated it.
+        submitted_at = time.perf_counter()
+        self.inference_pool.submit(
+            session_id,
+            self.emotion_service.detect_face,
+            lambda: (frame, self.session_data.get(session_id, {}).get("face_track")),
+            lambda detection: self.classify_detection(session_id, detection, submitted_at)
+        )
+
+    async def classify_detection(self, session_id: str, detection: Optional[Dict], submitted_at: float):
+        """Classify a detected face as part of a cross-session batch"""
+        if session_id in self.session_data:
+            self.session_data[session_id]["face_track"] = detection["track"] if detection else None
+
+        result = None
+        if detection is not None:
+            try:
+                emotion = await self.emotion_batcher.classify(detection["face"])
+                # Report the box in the coordinates of the frame the client sent
+                bounding_box = [v * config.FRAME_DECODE_SCALE for v in detection["bounding_box"]]
+                result = self.emotion_service.build_result(bounding_box, emotion)
+            except Exception as e:
+                print(f"Error in emotion analysis: {str(e)}")
+
+        await self.send_emotion_update(session_id, result)
+        await self.adjust_frame_rate(session_id, time.perf_counter() - submitted_at)
+
+    async def adjust_frame_rate(self, session_id: str, latency: float):
+        """Ask the client to speed up or slow down based on latency and pool load"""
+        interval = self.frame_rate_controller.record(session_id, latency, self.inference_pool.load())
+        if interval is not None:
             await self.send_message(session_id, {
-                "type": "emotion_update",
-                "data": error_result,
-                "frame_number": self.session_data[session_id].get("frame_count", 0)
+                "type": "frame_rate",
+                "interval": interval,
+                "drop_while_busy": True
             })
-            return error_result
+
+    async def send_emotion_update(self, session_id: str, result: Optional[Dict]):
+        """Record an analyzed frame and push the result to the client"""
+        if result is None:
+            result = self.emotion_service.no_face_result()
+
+        if session_id not in self.session_data:
+            return
+
+        self.session_data[session_id]["frame_count"] += 1
+        if result.get("face_detected"):
+            self.session_data[session_id]["emotions"].append(result)
+
+        await self.send_message(session_id, {
+            "type": "emotion_update",
+            "data": result,
+            "frame_number": self.session_data[session_id]["frame_count"]
+        })
     
     async def start_recording(self, session_id: str):
         """Start recording debate session"""
         if session_id in self.session_data:
+            if self.session_data[session_id]["recording_state"] == "processing":
+                await self.send_message(session_id, {
+                    "type": "error",
+                    "message": "Still analyzing your last debate. Please wait for the results."
+                })
+                return
+
             self.session_data[session_id]["recording_state"] = "recording"
             self.session_data[session_id]["recording_start_time"] = datetime.now()
-            self.session_data[session_id]["audio_data"] = bytearray()
-            self.session_data[session_id]["emotions"] = []  # Reset emotions for this recording
+            # One connection can record several debates; each gets its own row
+            self.session_data[session_id]["recording_id"] = f"{session_id}-{uuid.uuid4().hex[:8]}"
+            self.release_recording(self.session_data[session_id])
+            self.session_data[session_id]["recording"] = self.new_recording_buffer()
+            self.session_data[session_id]["voice_stream"] = self.voice_service.create_stream()
+            self.session_data[session_id]["emotions"] = self.new_emotion_timeline()  # Reset emotions for this recording
             
             await self.send_message(session_id, {
                 "type": "recording_started",
@@ -174,6 +344,9 @@ class ConnectionManager:
             return
         
         session = self.session_data[session_id]
+        # A repeated stop (or one without a recording) must not start a second analysis
+        if session["recording_state"] != "recording":
+            return
         session["recording_state"] = "processing"
         
         await self.send_message(session_id, {
@@ -181,61 +354,128 @@ class ConnectionManager:
             "message": "Processing your debate..."
         })
         
-        # Calculate duration
-        duration = (datetime.now() - session["recording_start_time"]).total_seconds()
-        
-        # Process audio
-        audio_bytes = bytes(session["audio_data"])
-        transcript_data = await self.speech_service.transcribe_audio(audio_bytes)
-        speech_analysis = self.speech_service.analyze_speech_patterns(transcript_data)
-        
-        # Voice analysis
-        voice_analysis = self.voice_service.analyze_audio(audio_bytes)
-        tone_description = self.voice_service.get_tone_description(voice_analysis)
-        
-        # Emotion summary
-        emotion_summary = self.get_session_summary(session_id)
-        
-        # Generate comprehensive feedback
-        feedback = await self.generate_feedback(
-            session_id,
-            transcript_data,
-            speech_analysis,
-            voice_analysis,
-            tone_description,
-            emotion_summary,
-            duration
-        )
-        
-        # Save to database
-        self.save_session_to_db(
-            session_id,
-            transcript_data,
-            speech_analysis,
-            voice_analysis,
-            emotion_summary,
-            feedback,
-            duration
-        )
+        try:
+            # Calculate duration
+            duration = (datetime.now() - session["recording_start_time"]).total_seconds()
         
-        # Send results to client
-        await self.send_message(session_id, {
-            "type": "analysis_complete",
-            "results": {
-                "transcript": transcript_data.get("text", ""),
-                "speech_analysis": speech_analysis,
-                "voice_analysis": voice_analysis,
-                "tone_description": tone_description,
-                "emotion_summary": emotion_summary,
-                "feedback": feedback,
-                "duration": duration
-            }
-        })
+            loop = asyncio.get_running_loop()
+            timings = {}
+
+            async def timed(stage: str, awaitable):
+                start = time.perf_counter()
+                try:
+                    return await awaitable
+                finally:
+                    timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+
+            # Analyzers read the recording from disk instead of copying it around
+            recording = session["recording"]
+            audio_path = recording.as_path() if recording is not None and recording.size else None
+
+            async def speech_stage():
+                transcript_data = await timed("transcription", self.speech_service.transcribe_audio(audio_path))
+                speech_analysis = await timed("speech_analysis", loop.run_in_executor(
+                    self.analysis_executor, self.speech_service.analyze_speech_patterns, transcript_data
+                ))
+                await self.send_partial(session_id, "speech", {
+                    "transcript": transcript_data.get("text", ""),
+                    "speech_analysis": speech_analysis
+                })
+                return transcript_data, speech_analysis
+
+            async def voice_stage():
+                # Already computed incrementally if the client streamed PCM
+                voice_stream = session.get("voice_stream")
+                if voice_stream is not None and voice_stream.duration > 0:
+                    job = voice_stream.finish
+                else:
+                    job = functools.partial(self.voice_service.analyze_audio, audio_path)
+                voice_analysis = await timed("voice_analysis", loop.run_in_executor(self.analysis_executor, job))
+                await self.send_partial(session_id, "voice", {
+                    "voice_analysis": voice_analysis,
+                    "tone_description": self.voice_service.get_tone_description(voice_analysis)
+                })
+                return voice_analysis
+
+            # Transcription and voice analysis run in parallel; the emotion summary
+            # is computed while they run
+            speech_task = asyncio.ensure_future(speech_stage())
+            voice_task = asyncio.ensure_future(voice_stage())
+
+            start = time.perf_counter()
+            emotion_summary = self.get_session_summary(session_id)
+            timings["emotion_summary"] = round((time.perf_counter() - start) * 1000, 1)
+            await self.send_partial(session_id, "emotion_summary", {"emotion_summary": emotion_summary})
+
+            (transcript_data, speech_analysis), voice_analysis = await asyncio.gather(speech_task, voice_task)
+            tone_description = self.voice_service.get_tone_description(voice_analysis)
+
+            overall_score = self._calculate_overall_score(speech_analysis, voice_analysis, emotion_summary)
+            await self.send_partial(session_id, "score", {"overall_score": overall_score})
+        
+            # Stream comprehensive feedback as soon as its inputs are ready
+            async def send_feedback_chunk(text: str):
+                await self.send_message(session_id, {
+                    "type": "analysis_partial",
+                    "stage": "feedback",
+                    "delta": text
+                })
+
+            feedback = await timed("feedback", self.generate_feedback(
+                session_id,
+                transcript_data,
+                speech_analysis,
+                voice_analysis,
+                tone_description,
+                emotion_summary,
+                duration,
+                on_chunk=send_feedback_chunk
+            ))
+        
+            record = self.build_session_record(
+                session_id,
+                transcript_data,
+                speech_analysis,
+                voice_analysis,
+                emotion_summary,
+                feedback,
+                duration,
+                overall_score
+            )
+        
+            # Send results to client
+            await self.send_message(session_id, {
+                "type": "analysis_complete",
+                "results": {
+                    "transcript": transcript_data.get("text", ""),
+                    "speech_analysis": speech_analysis,
+                    "voice_analysis": voice_analysis,
+                    "tone_description": tone_description,
+                    "emotion_summary": emotion_summary,
+                    "feedback": feedback,
+                    "overall_score": overall_score,
+                    "duration": duration,
+                    "timings": timings,
+                    "record_id": record["session_id"]  # For GET /api/sessions/{session_id}
+                }
+            })
+
+            # Queue the database write; it happens in a batch after the client has its results
+            self.save_session_to_db(session_id, record)
         
-        session["recording_state"] = "complete"
-        print(f"Analysis complete for session {session_id}")
+            self.release_recording(session)
+            session["recording_state"] = "complete"
+            print(f"Analysis complete for session {session_id}")
+        except Exception as e:
+            print(f"Error analyzing recording for session {session_id}: {str(e)}")
+            self.release_recording(session)
+            session["recording_state"] = "idle"
+            await self.send_message(session_id, {
+                "type": "analysis_failed",
+                "message": "Something went wrong while analyzing your debate. Please try again."
+            })
     
-    async def process_audio_chunk(self, session_id: str, audio_data: str):
+    async def process_audio_chunk(self, session_id: str, audio_data: Union[str, bytes, memoryview]):
         """Receive and store audio chunks during recording"""
         if session_id not in self.session_data:
             return
@@ -245,21 +485,58 @@ class ConnectionManager:
             return
         
         try:
-            # Decode base64 audio data
-            if ',' in audio_data:
-                audio_data = audio_data.split(',')[1]
-            
-            audio_bytes = base64.b64decode(audio_data)
-            session["audio_data"].extend(audio_bytes)
-            
+            if isinstance(audio_data, str):
+                # Decode base64 audio data
+                if ',' in audio_data:
+                    audio_data = audio_data.split(',')[1]
+                audio_data = base64.b64decode(audio_data)
+
+            if session["recording"] is None:
+                session["recording"] = self.new_recording_buffer()
+
+            recording = session["recording"]
+            already_truncated = recording.truncated
+            # Warn once; every later chunk is dropped as well
+            if not recording.write(audio_data) and not already_truncated:
+                await self.send_message(session_id, {
+                    "type": "error",
+                    "message": "Recording is too long. Only the first part will be analyzed."
+                })
+
         except Exception as e:
             print(f"Error processing audio chunk: {str(e)}")
     
+    async def process_audio_pcm(self, session_id: str, payload: memoryview):
+        """Feed live PCM into the session's voice analyzer and push running results"""
+        session = self.session_data.get(session_id)
+        if session is None or session["recording_state"] != "recording":
+            return
+
+        voice_stream = session.get("voice_stream")
+        if voice_stream is None:
+            return
+
+        try:
+            sample_rate, samples = parse_pcm_payload(payload)
+            loop = asyncio.get_running_loop()
+            updated = await loop.run_in_executor(None, voice_stream.add, samples, sample_rate)
+        except Exception as e:
+            print(f"Error processing audio stream: {str(e)}")
+            return
+
+        if updated:
+            voice_analysis = voice_stream.snapshot()
+            await self.send_message(session_id, {
+                "type": "voice_update",
+                "data": voice_analysis,
+                "tone_description": self.voice_service.get_tone_description(voice_analysis)
+            })
+
     async def generate_feedback(self, session_id: str, transcript_data: Dict, 
                                 speech_analysis: Dict, voice_analysis: Dict,
                                 tone_description: str, emotion_summary: Dict, 
-                                duration: float) -> str:
-        """Generate comprehensive AI feedback"""
+                                duration: float, on_chunk=None) -> str:
+        """Generate comprehensive AI feedback, streamed to on_chunk if given"""
         session = self.session_data[session_id]
         topic = session["topic"]
         
@@ -295,12 +572,22 @@ class ConnectionManager:
         Keep feedback constructive, specific, and encouraging.
         """
         
-        return await self.chat_service.get_gpt_response(session_id, prompt, emotion_summary)
+        # Only a short note goes into the chat history, not the full analysis
+        history_prompt = f"I just finished a {duration:.0f} second practice debate on \"{topic.get('topic')}\". How did I do?"
+        
+        if on_chunk is not None:
+            return await self.chat_service.stream_gpt_response(
+                session_id, prompt, on_chunk, emotion_summary, history_prompt=history_prompt
+            )
+        return await self.chat_service.get_gpt_response(
+            session_id, prompt, emotion_summary, history_prompt=history_prompt
+        )
     
     async def process_chat_message(self, session_id: str, prompt: str):
         """Handle chat messages"""
         summary = self.get_session_summary(session_id)
-        gpt_text = await self.chat_service.get_gpt_response(session_id, prompt, summary)
+        topic = self.session_data[session_id]["topic"] if session_id in self.session_data else None
+        gpt_text = await self.chat_service.get_gpt_response(session_id, prompt, summary, topic=topic)
 
         if session_id in self.session_data:
             self.session_data[session_id]["chat_history"].append({"role": "user", "content": prompt})
@@ -328,35 +615,55 @@ class ConnectionManager:
             "emotion_summary": summary
         }
     
-    def save_session_to_db(self, session_id: str, transcript_data: Dict, 
-                          speech_analysis: Dict, voice_analysis: Dict,
-                          emotion_summary: Dict, feedback: str, duration: float):
-        """Save session data to database"""
-        try:
-            session = self.session_data[session_id]
-            topic = session["topic"]
-            
-            session_data = {
-                "session_id": session_id,
-                "topic_id": topic.get("id"),
-                "topic_text": topic.get("topic"),
-                "duration": duration,
-                "transcript": transcript_data.get("text", ""),
-                "word_count": speech_analysis.get("word_count", 0),
-                "words_per_minute": speech_analysis.get("words_per_minute", 0),
-                "voice_analysis": voice_analysis,
-                "confidence_score": voice_analysis.get("confidence_score", 0),
-                "emotion_summary": emotion_summary.get("emotion_summary", {}),
-                "dominant_emotion": emotion_summary.get("emotion_summary", {}).get("dominant", "neutral"),
-                "ai_feedback": feedback,
-                "overall_score": self._calculate_overall_score(speech_analysis, voice_analysis, emotion_summary)
-            }
-            
-            SessionModel.create_session(sanitize(session_data))
-            print(f"Session {session_id} saved to database")
-            
-        except Exception as e:
-            print(f"Error saving session to database: {str(e)}")
+    def build_session_record(self, session_id: str, transcript_data: Dict,
+                             speech_analysis: Dict, voice_analysis: Dict,
+                             emotion_summary: Dict, feedback: str, duration: float,
+                             overall_score: float) -> Dict:
+        """Collect everything about a finished debate into a database row"""
+        session = self.session_data[session_id]
+        topic = session["topic"]
+        
+        return {
+            "session_id": session.get("recording_id") or session_id,
+            "topic_id": topic.get("id"),
+            "topic_text": topic.get("topic"),
+            "duration": duration,
+            "transcript": transcript_data.get("text", ""),
+            "word_count": speech_analysis.get("word_count", 0),
+            "words_per_minute": speech_analysis.get("words_per_minute", 0),
+            "voice_analysis": voice_analysis,
+            "confidence_score": voice_analysis.get("confidence_score", 0),
+            "emotion_summary": emotion_summary.get("emotion_summary", {}),
+            "dominant_emotion": emotion_summary.get("emotion_summary", {}).get("dominant", "neutral"),
+            "ai_feedback": feedback,
+            "overall_score": overall_score
+        }
+
+    def save_session_to_db(self, session_id: str, record: Dict):
+        """Hand the session row to the write-behind queue"""
+        self.persistence_queue.enqueue(sanitize(record))
+        print(f"Session {session_id} queued for saving")
+
+    def run_for_session(self, session_id: str, coro):
+        """Run a slow handler without blocking the session's receive loop; cancelled if the client disconnects"""
+        task = asyncio.create_task(coro)
+        tasks = self._session_tasks.setdefault(session_id, set())
+        tasks.add(task)
+
+        def done(task):
+            tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                print(f"Error handling message for session {session_id}: {str(task.exception())}")
+
+        task.add_done_callback(done)
+        return task
+
+    def run_in_background(self, coro):
+        """Run a coroutine without awaiting it, keeping a reference until it finishes"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
     
     def _calculate_overall_score(self, speech_analysis: Dict, voice_analysis: Dict, emotion_summary: Dict) -> float:
         """Calculate overall performance score (0-100)"""
@@ -7,11 +7,62 @@ load_dotenv()
 class Config:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./debate_sessions.db")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))  # Connections kept open per engine
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # Extra connections allowed under load
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Reopen connections older than this many seconds
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))  # How long SQLite waits on a locked database
+    PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "20"))  # Finished sessions written per transaction
+    PERSIST_FLUSH_INTERVAL = float(os.getenv("PERSIST_FLUSH_INTERVAL", "2.0"))  # Max seconds a finished session waits to be written
+    PERSIST_JOURNAL_PATH = os.getenv("PERSIST_JOURNAL_PATH", "./pending_sessions.jsonl")  # Sessions spooled here while the database is down
+    HISTORY_CACHE_SIZE = int(os.getenv("HISTORY_CACHE_SIZE", "128"))  # Session history API responses kept until the next write
     SECRET_KEY = os.getenv("SECRET_KEY")
     CORS_ORIGINS = ["http://localhost:5173", "http://localhost:3000"]
 
     FRAME_PROCESS_INTERVAL = 1.0        # Every second, process a video frame
+    FRAME_INTERVAL_MIN = float(os.getenv("FRAME_INTERVAL_MIN", str(FRAME_PROCESS_INTERVAL)))  # Fastest pace clients are told to send frames at; lower it to let idle servers sample faster
+    FRAME_INTERVAL_MAX = float(os.getenv("FRAME_INTERVAL_MAX", "5.0"))   # Slowest pace under heavy load
     AUDIO_CHUNK_DURATION = 3.0          # Every 3 secs, audio processes
+    GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))  # Seconds before a Gemini request is abandoned
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))  # Gemini requests in flight across all sessions
+    GEMINI_RATE_PER_MINUTE = float(os.getenv("GEMINI_RATE_PER_MINUTE", "30"))  # Requests per minute allowed by our Gemini quota
+    GEMINI_BURST = int(os.getenv("GEMINI_BURST", "5"))  # Requests that may go out back to back before pacing kicks in
+    GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "4"))  # Attempts per request when rate limited
+    GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "2.0"))  # First retry waits up to this many seconds, doubling after
+    GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "60"))  # Longest backoff without a retry-after hint
+    CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))  # Approximate tokens of past chat sent with each prompt
+    CHAT_SUMMARY_WORDS = int(os.getenv("CHAT_SUMMARY_WORDS", "150"))  # Target length when older chat turns are summarized
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))  # Chat replies kept for identical questions
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))  # Seconds a cached reply stays valid
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH")  # SQLite file to keep the cache across restarts, memory only if unset
+    ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))  # Threads for post-recording analysis
+    RECORDING_SPILL_BYTES = int(os.getenv("RECORDING_SPILL_BYTES", str(1024 * 1024)))  # Recordings past this size move to disk
+    MAX_RECORDING_BYTES = int(os.getenv("MAX_RECORDING_BYTES", str(50 * 1024 * 1024)))  # Per-session recording limit
+    RECORDING_DIR = os.getenv("RECORDING_DIR")  # Where spilled recordings go, defaults to the system temp dir
+    VOICE_ANALYSIS_SAMPLE_RATE = int(os.getenv("VOICE_ANALYSIS_SAMPLE_RATE", "16000"))  # 0 analyzes at the recording's native rate
+    VOICE_UPDATE_INTERVAL = float(os.getenv("VOICE_UPDATE_INTERVAL", "2.0"))  # Seconds of streamed audio per live voice_update
+
+    # Session state limits
+    SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))  # Seconds without messages before a session is evicted
+    MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "200"))  # Live sessions kept; the least recently active is evicted past this
+    SESSION_REAP_INTERVAL = float(os.getenv("SESSION_REAP_INTERVAL", "60"))  # Seconds between idle session sweeps
+    MAX_EMOTION_SAMPLES = int(os.getenv("MAX_EMOTION_SAMPLES", "3600"))  # Emotion results kept per session, oldest dropped first
+    MAX_CHAT_MESSAGES = int(os.getenv("MAX_CHAT_MESSAGES", "100"))  # Chat messages kept per session
+
+    FRAME_DECODE_SCALE = int(os.getenv("FRAME_DECODE_SCALE", "2"))    # JPEG frames are decoded at 1/N size (1, 2, 4 or 8)
+
+    # Emotion inference pool
+    INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")     # "thread" or "process"
+    INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+    FRAME_QUEUE_SIZE = int(os.getenv("FRAME_QUEUE_SIZE", "1"))        # Pending frames per session, older ones get dropped
+    EMOTION_BATCH_SIZE = int(os.getenv("EMOTION_BATCH_SIZE", "8"))     # Max face crops per classifier call
+    EMOTION_BATCH_WAIT_MS = float(os.getenv("EMOTION_BATCH_WAIT_MS", "10"))  # Max time to wait for a batch to fill
+    FACE_DETECTION_WIDTH = int(os.getenv("FACE_DETECTION_WIDTH", "320"))  # Frames are downscaled to this width for detection
+    FACE_CROP_MARGIN = float(os.getenv("FACE_CROP_MARGIN", "0.1"))     # Extra context around the face box, per side
+    FACE_TRACKING = os.getenv("FACE_TRACKING", "true").lower() == "true"  # Search near the last face instead of the full frame
+    FACE_REDETECT_INTERVAL = int(os.getenv("FACE_REDETECT_INTERVAL", "10"))  # Full-frame detection at least every N frames
+    FACE_TRACK_SEARCH_MARGIN = float(os.getenv("FACE_TRACK_SEARCH_MARGIN", "0.5"))  # Search region around the last box, per side
+    FACE_TRACK_FACE_WIDTH = int(os.getenv("FACE_TRACK_FACE_WIDTH", "80"))  # Face width the search region is scaled to
 
 
 config = Config()
\ No newline at end of file
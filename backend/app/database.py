@@ -1,56 +1,199 @@
-from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, JSON, Text
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import create_engine, event, func, select, cast, literal, union_all, Column, Index, String, Integer, Float, DateTime, JSON, Text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, deferred, sessionmaker
+from sqlalchemy.pool import StaticPool
 from datetime import datetime
-import os
+from app.config import config
+
+# Async drivers for each database the sync URL may point at
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Swap the driver in a sync database URL for its async counterpart"""
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        dialect, driver = scheme.split("+", 1)
+        if driver in ("aiosqlite", "asyncpg"):
+            return url
+        scheme = dialect
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+def to_sync_url(url: str) -> str:
+    """Drop an async driver so the sync engine can use the same URL"""
+    scheme, sep, rest = url.partition("://")
+    dialect, _, driver = scheme.partition("+")
+    if driver in ("aiosqlite", "asyncpg"):
+        return f"{'postgresql' if dialect == 'postgres' else dialect}{sep}{rest}"
+    return url
+
+
+def is_memory_url(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith(":"))
+
+
+def engine_options(url: str) -> dict:
+    """Pool settings; an in-memory SQLite database must stay on a single connection.
+
+    The sync and async engines then hold separate in-memory databases, so
+    init_async_db creates the tables on the async one as well.
+    """
+    if is_memory_url(url):
+        return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+    options = {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": not url.startswith("sqlite"),
+    }
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
 
 # Create database URL
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./debate_sessions.db")
+DATABASE_URL = to_sync_url(config.DATABASE_URL)
+ASYNC_DATABASE_URL = to_async_url(config.DATABASE_URL)
+
+# Create engines: sync for table creation and scripts, async for the app
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
 
-# Create engine
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets reads proceed during writes; NORMAL sync is safe with WAL and much faster"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+if DATABASE_URL.startswith("sqlite"):
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
 
 # Create session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Base class for models
 Base = declarative_base()
 
 class DebateSession(Base):
     __tablename__ = "debate_sessions"
+    __table_args__ = (
+        # Newest-first listing and keyset pagination on (created_at, id)
+        Index("ix_debate_sessions_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String, unique=True, index=True)
-    topic_id = Column(Integer)
+    topic_id = Column(Integer, index=True)
     topic_text = Column(String)
     duration = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    # Transcript data
-    transcript = Column(Text)
+    # Transcript data; the large columns load only when accessed or undeferred
+    transcript = deferred(Column(Text), group="details")
     word_count = Column(Integer)
     words_per_minute = Column(Float)
     
     # Voice analysis
-    voice_analysis = Column(JSON)
+    voice_analysis = deferred(Column(JSON), group="details")
     confidence_score = Column(Float)
     
     # Emotion data
-    emotion_summary = Column(JSON)
-    dominant_emotion = Column(String)
+    emotion_summary = deferred(Column(JSON), group="details")
+    dominant_emotion = Column(String, index=True)
     
     # AI Feedback
-    ai_feedback = Column(Text)
+    ai_feedback = deferred(Column(Text), group="details")
     overall_score = Column(Float)
 
+class SessionStats(Base):
+    """Running totals over debate_sessions, updated with every insert.
+
+    One row per (scope, key): scope "all" has a single row with an empty key,
+    "topic" is keyed by topic id and "day" by the UTC date (YYYY-MM-DD).
+    """
+    __tablename__ = "session_stats"
+
+    scope = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    session_count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0)
+    word_sum = Column(Integer, nullable=False, default=0)
+    duration_sum = Column(Float, nullable=False, default=0)
+
+def stats_rollup_query():
+    """SELECT computing every SessionStats row from debate_sessions in SQL"""
+    totals = [
+        func.count(DebateSession.id),
+        func.coalesce(func.sum(DebateSession.confidence_score), 0),
+        func.coalesce(func.sum(DebateSession.overall_score), 0),
+        func.coalesce(func.sum(DebateSession.word_count), 0),
+        func.coalesce(func.sum(DebateSession.duration), 0),
+    ]
+    topic_key = func.coalesce(cast(DebateSession.topic_id, String), "")
+    day_key = cast(func.date(DebateSession.created_at), String)
+    return union_all(
+        select(literal("all"), literal(""), *totals),
+        select(literal("topic"), topic_key, *totals).group_by(topic_key),
+        select(literal("day"), day_key, *totals).where(DebateSession.created_at.is_not(None)).group_by(day_key),
+    )
+
+def rebuild_stats(connection):
+    """Recompute session_stats from scratch with one aggregation query"""
+    connection.execute(SessionStats.__table__.delete())
+    connection.execute(SessionStats.__table__.insert().from_select(
+        ["scope", "key", "session_count", "confidence_sum", "score_sum", "word_sum", "duration_sum"],
+        stats_rollup_query()
+    ))
+
 # Create tables
 def init_db():
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so add indexes introduced since
+    for index in DebateSession.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    # Backfill the aggregates for databases created before session_stats existed
+    with engine.begin() as connection:
+        has_sessions = connection.execute(select(DebateSession.id).limit(1)).first() is not None
+        has_stats = connection.execute(select(SessionStats.scope).limit(1)).first() is not None
+        if has_sessions and not has_stats:
+            rebuild_stats(connection)
+            print("Session stats backfilled.")
     print("Database tables created.")
 
+async def init_async_db():
+    """Create the tables through the async engine; only needed when it doesn't share the sync engine's database"""
+    if is_memory_url(ASYNC_DATABASE_URL):
+        async with async_engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+async def dispose_engines():
+    """Close pooled connections on shutdown"""
+    await async_engine.dispose()
+    engine.dispose()
+
 # Get database session
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
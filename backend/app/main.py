@@ -1,10 +1,14 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from app.api.websocket import manager
+from app.api.sessions import router as sessions_router
+from app.api.protocol import parse_binary_message
 from app.services.topic_service import TopicService
-from app.database import init_db
+from app.database import init_db, init_async_db, dispose_engines
+from app.config import config
+import asyncio
 import json
 import os
 
@@ -24,21 +28,89 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Registered before the SPA catch-all at the bottom so /api/sessions isn't served index.html
+app.include_router(sessions_router)
+
+@app.on_event("startup")
+async def startup():
+    # Warm up in the background so /api/health answers while models load
+    app.state.warm_up_task = asyncio.create_task(manager.warm_up_models())
+    app.state.reaper_task = asyncio.create_task(manager.session_data.run_reaper(config.SESSION_REAP_INTERVAL))
+    await init_async_db()
+    await manager.persistence_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.reaper_task.cancel()
+    manager.inference_pool.shutdown()
+    manager.analysis_executor.shutdown(wait=True)
+    manager.chat_service.cache.close()
+    await manager.persistence_queue.stop()
+    await dispose_engines()
+
 @app.get("/api/health")
 async def health():
     return {"status": "ok"}
 
+@app.get("/api/ready")
+async def ready():
+    if not manager.models_ready:
+        return JSONResponse(status_code=503, content={"status": "loading"})
+    return {"status": "ready"}
+
+@app.get("/api/metrics")
+async def metrics():
+    return {
+        "inference": manager.inference_pool.stats(),
+        "batching": manager.emotion_batcher.stats(),
+        "frame_rate": manager.frame_rate_controller.stats(),
+        "chat": manager.chat_service.stats(),
+        "sessions": manager.session_stats(),
+        "persistence": manager.persistence_queue.stats(),
+        "history_cache": manager.history_cache.stats()
+    }
+
+# Messages that mean someone is using the session. Frames are left out: an open
+# tab with the camera on sends them forever, and would never go idle.
+ACTIVITY_MESSAGES = {"start_recording", "stop_recording", "audio_complete", "audio_pcm", "chat", "request_new_topic"}
+
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     await manager.connect(session_id, websocket)
 
     try:
         while True:
-            data = await websocket.receive_text()
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+
+            # Binary messages carry raw frames and audio
+            if received.get("bytes") is not None:
+                try:
+                    message_type, timestamp, payload = parse_binary_message(received["bytes"])
+                except ValueError as e:
+                    await manager.send_message(session_id, {
+                        "type": "error",
+                        "message": str(e)
+                    })
+                    continue
+
+                if message_type in ACTIVITY_MESSAGES:
+                    manager.session_data.touch(session_id)
+
+                if message_type == "frame":
+                    await manager.process_frame(session_id, payload, timestamp)
+                elif message_type == "audio_complete":
+                    await manager.process_audio_chunk(session_id, payload)
+                elif message_type == "audio_pcm":
+                    await manager.process_audio_pcm(session_id, payload)
+                continue
+
+            data = received.get("text")
 
             try:
                 message = json.loads(data)
-            except json.JSONDecodeError:
+            except (TypeError, json.JSONDecodeError):
                 await manager.send_message(session_id, {
                     "type": "error",
                     "message": "Invalid JSON received"
@@ -46,6 +118,8 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 continue
 
             message_type = message.get("type")
+            if message_type in ACTIVITY_MESSAGES:
+                manager.session_data.touch(session_id)
 
             if message_type == "frame":
                 await manager.process_frame(
@@ -58,7 +132,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 await manager.start_recording(session_id)
 
             elif message_type == "stop_recording":
-                await manager.stop_recording(session_id)
+                manager.run_for_session(session_id, manager.stop_recording(session_id))
 
             elif message_type == "audio_complete":
                 await manager.process_audio_chunk(
@@ -67,10 +141,10 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 )
 
             elif message_type == "chat":
-                await manager.process_chat_message(
+                manager.run_for_session(session_id, manager.process_chat_message(
                     session_id,
                     message.get("message")
-                )
+                ))
 
             elif message_type == "request_new_topic":
                 new_topic = topic_service.get_random_topic()
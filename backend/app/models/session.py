@@ -1,6 +1,150 @@
 from datetime import datetime
-from typing import Dict, Optional
-from app.database import DebateSession, SessionLocal
+from typing import Dict, List, Optional, Tuple
+import base64
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import undefer_group
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.database import AsyncSessionLocal, DebateSession, SessionLocal, SessionStats, async_engine, engine
+
+
+def build_debate_session(session_data: Dict) -> DebateSession:
+    session = DebateSession(
+        session_id=session_data.get("session_id"),
+        topic_id=session_data.get("topic_id"),
+        topic_text=session_data.get("topic_text"),
+        duration=session_data.get("duration", 0),
+        transcript=session_data.get("transcript", ""),
+        word_count=session_data.get("word_count", 0),
+        words_per_minute=session_data.get("words_per_minute", 0),
+        voice_analysis=session_data.get("voice_analysis", {}),
+        confidence_score=session_data.get("confidence_score", 0),
+        emotion_summary=session_data.get("emotion_summary", {}),
+        dominant_emotion=session_data.get("dominant_emotion", "neutral"),
+        ai_feedback=session_data.get("ai_feedback", ""),
+        overall_score=session_data.get("overall_score", 0)
+    )
+    # Rows written behind carry the time the debate finished, not the time of the insert
+    created_at = session_data.get("created_at") or datetime.utcnow()
+    session.created_at = datetime.fromisoformat(created_at) if isinstance(created_at, str) else created_at
+    return session
+
+
+def stats_updates(sessions: List[DebateSession], dialect_name: str) -> list:
+    """Upserts adding new sessions to the overall, per-topic and per-day totals in session_stats"""
+    deltas = {}
+    for session in sessions:
+        keys = [
+            ("all", ""),
+            ("topic", "" if session.topic_id is None else str(session.topic_id)),
+            ("day", session.created_at.date().isoformat()),
+        ]
+        for key in keys:
+            delta = deltas.setdefault(key, [0, 0.0, 0.0, 0, 0.0])
+            delta[0] += 1
+            delta[1] += session.confidence_score or 0
+            delta[2] += session.overall_score or 0
+            delta[3] += session.word_count or 0
+            delta[4] += session.duration or 0
+
+    insert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+    statements = []
+    for (scope, key), (count, confidence, score, words, duration) in deltas.items():
+        statement = insert(SessionStats).values(
+            scope=scope, key=key, session_count=count, confidence_sum=confidence,
+            score_sum=score, word_sum=words, duration_sum=duration
+        )
+        statements.append(statement.on_conflict_do_update(
+            index_elements=["scope", "key"],
+            set_={
+                "session_count": SessionStats.session_count + statement.excluded.session_count,
+                "confidence_sum": SessionStats.confidence_sum + statement.excluded.confidence_sum,
+                "score_sum": SessionStats.score_sum + statement.excluded.score_sum,
+                "word_sum": SessionStats.word_sum + statement.excluded.word_sum,
+                "duration_sum": SessionStats.duration_sum + statement.excluded.duration_sum,
+            }
+        ))
+    return statements
+
+
+# Columns for list views; leaves out the transcript, feedback and analysis JSON
+SUMMARY_COLUMNS = (
+    DebateSession.id,
+    DebateSession.session_id,
+    DebateSession.topic_id,
+    DebateSession.topic_text,
+    DebateSession.duration,
+    DebateSession.created_at,
+    DebateSession.word_count,
+    DebateSession.words_per_minute,
+    DebateSession.confidence_score,
+    DebateSession.dominant_emotion,
+    DebateSession.overall_score,
+)
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque page cursor pointing just past the given row"""
+    raw = f"{created_at.isoformat()},{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError for a cursor that wasn't produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit(",", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def newest_first(query, cursor: Optional[str] = None):
+    """Order by (created_at, id) descending, continuing after `cursor` if given.
+
+    Seeking past the last row seen stays fast on deep pages, where OFFSET
+    would scan and discard every earlier row.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(DebateSession.created_at, DebateSession.id) < (created_at, row_id))
+    return query.order_by(DebateSession.created_at.desc(), DebateSession.id.desc())
+
+
+def summaries_query(limit: int, cursor: Optional[str] = None, topic_id: Optional[int] = None,
+                    dominant_emotion: Optional[str] = None):
+    query = select(*SUMMARY_COLUMNS)
+    if topic_id is not None:
+        query = query.where(DebateSession.topic_id == topic_id)
+    if dominant_emotion is not None:
+        query = query.where(DebateSession.dominant_emotion == dominant_emotion)
+    # One extra row tells whether there is another page
+    return newest_first(query, cursor).limit(limit + 1)
+
+
+def summary_page(rows: list, limit: int) -> Dict:
+    sessions = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = sessions[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    for session in sessions:
+        session["created_at"] = session["created_at"].isoformat() if session["created_at"] else None
+    return {"sessions": sessions, "next_cursor": next_cursor}
+
+
+def format_stats(stats: Optional[SessionStats]) -> Dict:
+    if stats is None or not stats.session_count:
+        return {}
+    count = stats.session_count
+    return {
+        "total_sessions": count,
+        "average_confidence": round(stats.confidence_sum / count, 1),
+        "average_score": round(stats.score_sum / count, 1),
+        "total_words_spoken": stats.word_sum,
+        "average_duration": round(stats.duration_sum / count, 1)
+    }
+
 
 class SessionModel:
     """Handle database operations for debate sessions"""
@@ -10,24 +154,13 @@ class SessionModel:
         """Create a new debate session in the database"""
         db = SessionLocal()
         try:
-            session = DebateSession(
-                session_id=session_data.get("session_id"),
-                topic_id=session_data.get("topic_id"),
-                topic_text=session_data.get("topic_text"),
-                duration=session_data.get("duration", 0),
-                transcript=session_data.get("transcript", ""),
-                word_count=session_data.get("word_count", 0),
-                words_per_minute=session_data.get("words_per_minute", 0),
-                voice_analysis=session_data.get("voice_analysis", {}),
-                confidence_score=session_data.get("confidence_score", 0),
-                emotion_summary=session_data.get("emotion_summary", {}),
-                dominant_emotion=session_data.get("dominant_emotion", "neutral"),
-                ai_feedback=session_data.get("ai_feedback", ""),
-                overall_score=session_data.get("overall_score", 0)
-            )
+            session = build_debate_session(session_data)
             db.add(session)
+            for statement in stats_updates([session], engine.dialect.name):
+                db.execute(statement)
             db.commit()
-            db.refresh(session)
+            # A plain refresh skips the deferred "details" columns, which can't load once the session closes
+            db.refresh(session, attribute_names=[attr.key for attr in DebateSession.__mapper__.column_attrs])
             return session
         except Exception as e:
             print(f"Error creating session: {e}")
@@ -41,38 +174,119 @@ class SessionModel:
         """Retrieve a session by ID"""
         db = SessionLocal()
         try:
-            return db.query(DebateSession).filter(DebateSession.session_id == session_id).first()
+            return (
+                db.query(DebateSession).options(undefer_group("details"))
+                .filter(DebateSession.session_id == session_id).first()
+            )
         finally:
             db.close()
     
     @staticmethod
-    def get_all_sessions(limit: int = 20) -> list:
-        """Get recent sessions"""
+    def get_all_sessions(limit: int = 20, cursor: Optional[str] = None) -> list:
+        """Get recent sessions as full rows; list views should use get_session_summaries"""
+        db = SessionLocal()
+        try:
+            query = select(DebateSession).options(undefer_group("details"))
+            return list(db.scalars(newest_first(query, cursor).limit(limit)))
+        finally:
+            db.close()
+
+    @staticmethod
+    def get_session_summaries(limit: int = 20, cursor: Optional[str] = None, topic_id: Optional[int] = None,
+                              dominant_emotion: Optional[str] = None) -> Dict:
+        """A page of session summaries, newest first, with the cursor for the next page"""
         db = SessionLocal()
         try:
-            return db.query(DebateSession).order_by(DebateSession.created_at.desc()).limit(limit).all()
+            rows = db.execute(summaries_query(limit, cursor, topic_id, dominant_emotion)).all()
+            return summary_page(rows, limit)
         finally:
             db.close()
     
     @staticmethod
     def get_user_stats() -> Dict:
-        """Calculate user statistics across all sessions"""
+        """User statistics across all sessions, read from the maintained totals"""
         db = SessionLocal()
         try:
-            sessions = db.query(DebateSession).all()
-            if not sessions:
-                return {}
-            
-            total_sessions = len(sessions)
-            avg_confidence = sum(s.confidence_score for s in sessions if s.confidence_score) / total_sessions
-            avg_score = sum(s.overall_score for s in sessions if s.overall_score) / total_sessions
-            total_words = sum(s.word_count for s in sessions if s.word_count)
-            
-            return {
-                "total_sessions": total_sessions,
-                "average_confidence": round(avg_confidence, 1),
-                "average_score": round(avg_score, 1),
-                "total_words_spoken": total_words
-            }
+            return format_stats(db.get(SessionStats, ("all", "")))
         finally:
-            db.close()
\ No newline at end of file
+            db.close()
+
+
+class AsyncSessionModel:
+    """Async versions of the SessionModel operations, for use on the event loop"""
+
+    @staticmethod
+    async def create_session(session_data: Dict) -> Optional[DebateSession]:
+        """Create a new debate session in the database"""
+        async with AsyncSessionLocal() as db:
+            try:
+                session = build_debate_session(session_data)
+                db.add(session)
+                for statement in stats_updates([session], async_engine.dialect.name):
+                    await db.execute(statement)
+                await db.commit()
+                return session
+            except Exception as e:
+                print(f"Error creating session: {e}")
+                await db.rollback()
+                return None
+
+    @staticmethod
+    async def create_sessions(records: List[Dict]) -> int:
+        """Insert many sessions in one transaction. Errors are raised so the caller can retry or journal."""
+        async with AsyncSessionLocal() as db:
+            sessions = [build_debate_session(record) for record in records]
+            db.add_all(sessions)
+            for statement in stats_updates(sessions, async_engine.dialect.name):
+                await db.execute(statement)
+            await db.commit()
+            return len(records)
+
+    @staticmethod
+    async def get_session(session_id: str) -> Optional[DebateSession]:
+        """Retrieve a session by ID"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(DebateSession).options(undefer_group("details"))
+                .where(DebateSession.session_id == session_id)
+            )
+            return result.scalars().first()
+
+    @staticmethod
+    async def get_all_sessions(limit: int = 20, cursor: Optional[str] = None) -> list:
+        """Get recent sessions as full rows; list views should use get_session_summaries"""
+        async with AsyncSessionLocal() as db:
+            query = select(DebateSession).options(undefer_group("details"))
+            result = await db.execute(newest_first(query, cursor).limit(limit))
+            return list(result.scalars().all())
+
+    @staticmethod
+    async def get_session_summaries(limit: int = 20, cursor: Optional[str] = None, topic_id: Optional[int] = None,
+                                    dominant_emotion: Optional[str] = None) -> Dict:
+        """A page of session summaries, newest first, with the cursor for the next page"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(summaries_query(limit, cursor, topic_id, dominant_emotion))
+            return summary_page(result.all(), limit)
+
+    @staticmethod
+    async def get_user_stats() -> Dict:
+        """User statistics across all sessions, read from the maintained totals"""
+        async with AsyncSessionLocal() as db:
+            return format_stats(await db.get(SessionStats, ("all", "")))
+
+    @staticmethod
+    async def get_topic_stats() -> Dict[str, Dict]:
+        """Statistics per debate topic id"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(SessionStats).where(SessionStats.scope == "topic"))
+            return {row.key: format_stats(row) for row in result.scalars()}
+
+    @staticmethod
+    async def get_daily_stats(days: int = 30) -> Dict[str, Dict]:
+        """Statistics per UTC day for the most recent `days` days with sessions"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(SessionStats).where(SessionStats.scope == "day")
+                .order_by(SessionStats.key.desc()).limit(days)
+            )
+            return {row.key: format_stats(row) for row in result.scalars()}
@@ -1,7 +1,20 @@
 from app.config import config
+from app.services.rate_limiter import RateLimiter
+from app.services.response_cache import ResponseCache
+from app.services.conversation_history import ConversationHistory
 import google.generativeai as genai
-from typing import Dict, List
+from google.api_core import exceptions as google_exceptions
+from typing import Awaitable, Callable, Dict, List, Optional
 import asyncio
+import random
+import re
+import time
+
+# Retry hints Gemini puts in its 429 error text
+RETRY_HINT_PATTERNS = [
+    re.compile(r"retry in ([\d.]+)\s*s", re.IGNORECASE),
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE),
+]
 
 class ChatService:
     def __init__(self):
@@ -11,21 +24,41 @@ class ChatService:
 
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel('gemini-2.0-flash-lite')
-        self._chats: Dict[str, list] = {}  # session_id -> conversation history
+        self._chats: Dict[str, ConversationHistory] = {}  # session_id -> conversation history
+        self._summary_tasks: Dict[str, asyncio.Task] = {}
+        self.history_budget = config.CHAT_HISTORY_TOKEN_BUDGET
+        self.summary_words = config.CHAT_SUMMARY_WORDS
+        self.summaries = 0
+        self.timeout = config.GEMINI_TIMEOUT
+        self.max_concurrency = max(1, config.GEMINI_MAX_CONCURRENCY)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = 0
+        self.requests = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.rate_limited = 0
+        self.max_retries = max(1, config.GEMINI_MAX_RETRIES)
+        self.backoff_base = config.GEMINI_BACKOFF_BASE
+        self.backoff_max = config.GEMINI_BACKOFF_MAX
+        self.rate_limiter = RateLimiter(
+            rate_per_minute=config.GEMINI_RATE_PER_MINUTE,
+            burst=config.GEMINI_BURST
+        )
+        self.cache = ResponseCache(
+            max_entries=config.RESPONSE_CACHE_SIZE,
+            ttl=config.RESPONSE_CACHE_TTL,
+            path=config.RESPONSE_CACHE_PATH
+        )
         print(f"ChatService initialized with Gemini API (model: gemini-2.0-flash-lite, key set: {bool(self.api_key)})")
 
-    def _get_history(self, session_id: str) -> list:
+    def _get_history(self, session_id: str) -> ConversationHistory:
         if session_id not in self._chats:
-            self._chats[session_id] = []
+            self._chats[session_id] = ConversationHistory(self.history_budget, config.MAX_CHAT_MESSAGES)
         return self._chats[session_id]
 
-    async def get_gpt_response(self, session_id: str, prompt: str,
-                                emotion_summary: Dict = None,
-                                chat_history: List[Dict] = None) -> str:
-        """Get Gemini response with full conversation context"""
-        if not self.api_key:
-            return "Error: Gemini API key is not configured. Please set GEMINI_API_KEY."
-
+    def _build_conversation(self, session_id: str, prompt: str, emotion_summary: Dict = None,
+                            topic: Dict = None) -> str:
+        """Build the prompt with coaching instructions and recent conversation history"""
         system_context = (
             "You are Polly AI, an expert debate coach. You help people improve their "
             "debate and public speaking skills through constructive feedback and encouragement. "
@@ -36,13 +69,16 @@ class ChatService:
             emotions = emotion_summary.get("emotion_summary", {})
             system_context += f"\n\nThe user's current emotional state detected via camera: {emotions.get('dominant', 'neutral')}"
 
-        # Build conversation context from chat history
-        history = self._get_history(session_id)
+        if topic and topic.get("topic"):
+            system_context += f"\n\nThe user is practicing this debate topic: {topic.get('topic')}"
 
-        # Include recent history (last 10 exchanges) for context
-        recent = history[-20:] if len(history) > 20 else history
+        # Build conversation context from the summary and recent history that fit the token budget
+        summary, recent = self._get_history(session_id).context()
         conversation = f"{system_context}\n\n"
 
+        if summary:
+            conversation += f"Summary of the earlier conversation:\n{summary}\n\n"
+
         if recent:
             conversation += "Previous conversation:\n"
             for msg in recent:
@@ -51,40 +87,281 @@ class ChatService:
             conversation += "\n"
 
         conversation += f"User: {prompt}"
+        return conversation
+
+    def _cache_key(self, session_id: str, prompt: str, emotion_summary: Dict = None, topic: Dict = None) -> str:
+        """Key on everything the reply depends on: the question, topic, mood and prior conversation"""
+        emotions = (emotion_summary or {}).get("emotion_summary") or {}
+        return self.cache.make_key(
+            prompt,
+            topic=(topic or {}).get("topic"),
+            emotion=emotions.get("dominant"),
+            history=self._get_history(session_id).context()
+        )
+
+    def _remember(self, session_id: str, prompt: str, reply: str):
+        history = self._get_history(session_id)
+        history.add("user", prompt)
+        history.add("assistant", reply)
+
+        # Fold older turns into a summary in the background once they outgrow the budget
+        task = self._summary_tasks.get(session_id)
+        if history.needs_summary() and (task is None or task.done()):
+            self._summary_tasks[session_id] = asyncio.create_task(self._summarize(session_id, history))
+
+    async def _summarize(self, session_id: str, history: ConversationHistory):
+        folded = history.pending_summary()
+        if not folded:
+            return
+
+        transcript = "\n".join(
+            f"{'User' if m['role'] == 'user' else 'Polly AI'}: {m['content']}" for m in folded
+        )
+        prompt = (
+            f"Summarize this conversation between a debate student and their coach, Polly AI, "
+            f"in at most {self.summary_words} words. Keep the student's goals, weak spots and "
+            f"the advice given, since later questions may refer to them.\n\n"
+        )
+        if history.summary:
+            prompt += f"Summary so far:\n{history.summary}\n\n"
+        prompt += f"Conversation:\n{transcript}"
+
+        try:
+            summary = await self._generate(session_id, prompt)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Context is still trimmed to the budget, just without the summary
+            print(f"Could not summarize chat history for session {session_id}: {str(e) or type(e).__name__}")
+            return
+
+        history.apply_summary(summary, len(folded))
+        self.summaries += 1
+        print(f"Summarized {len(folded)} messages for session {session_id}")
+
+    @staticmethod
+    def _is_rate_limited(error: Exception) -> bool:
+        """Quota errors only; anything else must not pause the shared limiter"""
+        # ResourceExhausted, which Gemini raises for quota errors, subclasses TooManyRequests
+        if isinstance(error, google_exceptions.TooManyRequests):
+            return True
+        return re.search(r"\b429\b", str(error)) is not None
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Seconds the API asked us to wait, from a Retry-After header or the error text"""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if headers and headers.get("retry-after"):
+            try:
+                return float(headers.get("retry-after"))
+            except ValueError:
+                pass
+
+        for pattern in RETRY_HINT_PATTERNS:
+            match = pattern.search(str(error))
+            if match:
+                return float(match.group(1))
+        return None
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Jittered exponential backoff, or the server's hint plus jitter when it gave one"""
+        hint = self._retry_after(error)
+        if hint is not None:
+            return hint + random.uniform(0, self.backoff_base)
+
+        backoff = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return random.uniform(backoff / 2, backoff)
+
+    async def _generate(self, session_id: str, conversation: str) -> str:
+        """One non-streaming Gemini call, paced by the rate limiter and limited in concurrency and time"""
+        await self.rate_limiter.acquire(session_id)
+        async with self._semaphore:
+            self.in_flight += 1
+            self.requests += 1
+            try:
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(conversation),
+                    timeout=self.timeout
+                )
+                return response.text.strip()
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            finally:
+                self.in_flight -= 1
+
+    async def _stream(self, session_id: str, conversation: str,
+                      on_chunk: Callable[[str], Awaitable[None]], parts: List[str]):
+        """One streaming Gemini call; text that arrived is left in parts even if the call fails"""
+        await self.rate_limiter.acquire(session_id)
+        async with self._semaphore:
+            self.in_flight += 1
+            self.requests += 1
+            try:
+                async def consume():
+                    response = await self.model.generate_content_async(conversation, stream=True)
+                    async for chunk in response:
+                        text = chunk.text
+                        if text:
+                            parts.append(text)
+                            await on_chunk(text)
+
+                await asyncio.wait_for(consume(), timeout=self.timeout)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            finally:
+                self.in_flight -= 1
 
-        # Retry up to 3 times for rate limit errors
-        max_retries = 3
+    def _error_reply(self, error: Exception) -> str:
+        """User-facing message for a failed Gemini call"""
+        if self._is_rate_limited(error):
+            return "I'm currently at my request limit. Please wait a minute and try again."
+
+        error_str = str(error)
+        if "403" in error_str or "key" in error_str.lower():
+            return "There's an issue with the AI configuration. Please contact the admin."
+
+        return "I'm having trouble responding right now. Please try again."
+
+    async def get_gpt_response(self, session_id: str, prompt: str,
+                                emotion_summary: Dict = None,
+                                chat_history: List[Dict] = None,
+                                topic: Dict = None,
+                                history_prompt: str = None) -> str:
+        """Get Gemini response with full conversation context, reusing cached replies to identical questions.
+
+        history_prompt, if given, is stored in the conversation history in
+        place of a bulky prompt.
+        """
+        if not self.api_key:
+            return "Error: Gemini API key is not configured. Please set GEMINI_API_KEY."
+
+        cache_key = self._cache_key(session_id, prompt, emotion_summary, topic)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            self._remember(session_id, history_prompt or prompt, cached)
+            return cached
+
+        conversation = self._build_conversation(session_id, prompt, emotion_summary, topic)
+        start = time.perf_counter()
+
+        # Retry rate limit errors with backoff
+        max_retries = self.max_retries
         for attempt in range(max_retries):
             try:
-                response = self.model.generate_content(conversation)
-                reply = response.text.strip()
+                reply = await self._generate(session_id, conversation)
+                await self.cache.put(cache_key, reply, time.perf_counter() - start)
 
                 # Store in history
-                history.append({"role": "user", "content": prompt})
-                history.append({"role": "assistant", "content": reply})
+                self._remember(session_id, history_prompt or prompt, reply)
 
                 return reply
 
+            except asyncio.TimeoutError:
+                print(f"Gemini API timed out after {self.timeout}s for session {session_id}")
+                return "I'm taking too long to respond right now. Please try again."
+
             except Exception as e:
                 error_str = str(e)
                 print(f"Gemini API error (attempt {attempt + 1}/{max_retries}): {error_str}")
 
-                # Retry on rate limit (429) errors
-                if "429" in error_str or "rate" in error_str.lower():
-                    if attempt < max_retries - 1:
-                        wait_time = (attempt + 1) * 5  # 5s, 10s, 15s
-                        print(f"Rate limited. Waiting {wait_time}s before retry...")
-                        await asyncio.sleep(wait_time)
-                        continue
-                    return "I'm currently at my request limit. Please wait a minute and try again."
+                # Rate limited: hold back every request, not just this one
+                if self._is_rate_limited(e) and attempt < max_retries - 1:
+                    self._back_off(attempt, e)
+                    continue
+
+                return self._error_reply(e)
+
+        return "I'm having trouble responding right now. Please try again."
+
+    async def stream_gpt_response(self, session_id: str, prompt: str,
+                                  on_chunk: Callable[[str], Awaitable[None]],
+                                  emotion_summary: Dict = None,
+                                  history_prompt: str = None) -> str:
+        """Stream a Gemini response, passing each piece of text to on_chunk as it arrives.
+
+        Returns the full reply. Rate-limited requests are only retried while
+        nothing has been streamed yet; errors after that end the reply early.
+        history_prompt works as in get_gpt_response.
+        """
+        if not self.api_key:
+            reply = "Error: Gemini API key is not configured. Please set GEMINI_API_KEY."
+            await on_chunk(reply)
+            return reply
+
+        conversation = self._build_conversation(session_id, prompt, emotion_summary)
+
+        max_retries = self.max_retries
+        for attempt in range(max_retries):
+            parts = []
+            try:
+                await self._stream(session_id, conversation, on_chunk, parts)
+
+                reply = "".join(parts).strip()
+                self._remember(session_id, history_prompt or prompt, reply)
+                return reply
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error_str = str(e) or type(e).__name__
+                print(f"Gemini streaming error (attempt {attempt + 1}/{max_retries}): {error_str}")
+
+                if parts:
+                    # The client already has part of the reply; keep what arrived
+                    reply = "".join(parts).strip()
+                    self._remember(session_id, history_prompt or prompt, reply)
+                    return reply
 
-                if "403" in error_str or "key" in error_str.lower():
-                    return "There's an issue with the AI configuration. Please contact the admin."
+                if self._is_rate_limited(e) and attempt < max_retries - 1:
+                    self._back_off(attempt, e)
+                    continue
 
-                return "I'm having trouble responding right now. Please try again."
+                if isinstance(e, asyncio.TimeoutError):
+                    reply = "I'm taking too long to respond right now. Please try again."
+                else:
+                    reply = self._error_reply(e)
+                await on_chunk(reply)
+                return reply
 
         return "I'm having trouble responding right now. Please try again."
 
+    def _back_off(self, attempt: int, error: Exception):
+        """Pause the shared rate limiter; the retry then waits in line for its turn"""
+        self.rate_limited += 1
+        delay = self._backoff_delay(attempt, error)
+        self.rate_limiter.pause(delay)
+        print(f"Rate limited. Retrying in {delay:.1f}s...")
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "timeout": self.timeout,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "rate_limited": self.rate_limited,
+            "summaries": self.summaries,
+            "rate_limit": self.rate_limiter.stats(),
+            "cache": self.cache.stats()
+        }
+
+    def history_bytes(self) -> Dict[str, int]:
+        """Approximate bytes of conversation history held per session"""
+        return {session_id: history.nbytes for session_id, history in self._chats.items()}
+
     def clear_history(self, session_id: str):
         """Clear conversation history for a session"""
         self._chats.pop(session_id, None)
+        task = self._summary_tasks.pop(session_id, None)
+        if task is not None and not task.done():
+            task.cancel()
@@ -0,0 +1,77 @@
+from typing import Dict, List, Tuple
+import math
+
+# Gemini averages roughly four characters of English per token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate, close enough for budgeting without a tokenizer call"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+class ConversationHistory:
+    """One session's chat history, kept within a token budget.
+
+    Recent messages are sent verbatim, newest first until the budget is used
+    up. Once the stored messages outgrow the budget, the oldest ones are handed
+    out for summarizing (`pending_summary`) and replaced by that summary
+    (`apply_summary`), so earlier context survives in a few sentences instead
+    of being resent in full or dropped.
+    """
+
+    def __init__(self, token_budget: int = 1500, max_messages: int = 100):
+        self.token_budget = max(1, token_budget)
+        self.max_messages = max(2, max_messages)
+        self.messages: List[Dict] = []
+        self.summary = ""
+        self.summary_tokens = 0
+
+    def add(self, role: str, content: str):
+        self.messages.append({"role": role, "content": content, "tokens": estimate_tokens(content)})
+        # Backstop for when summarizing keeps failing; drop the oldest exchange
+        if len(self.messages) > self.max_messages:
+            del self.messages[:2]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate bytes of text held"""
+        return len(self.summary) + sum(len(m["content"]) for m in self.messages)
+
+    @property
+    def tokens(self) -> int:
+        return self.summary_tokens + sum(m["tokens"] for m in self.messages)
+
+    def context(self) -> Tuple[str, List[Dict]]:
+        """The summary plus as many recent messages as fit in the budget"""
+        remaining = self.token_budget - self.summary_tokens
+        recent = []
+        for message in reversed(self.messages):
+            if message["tokens"] > remaining:
+                break
+            recent.append(message)
+            remaining -= message["tokens"]
+        recent.reverse()
+        return self.summary, recent
+
+    def needs_summary(self) -> bool:
+        return sum(m["tokens"] for m in self.messages) > self.token_budget
+
+    def pending_summary(self) -> List[Dict]:
+        """Oldest messages to fold into the summary, leaving half the budget of recent turns"""
+        keep = self.token_budget // 2
+        kept = 0
+        cut = len(self.messages)
+        while cut > 0 and kept + self.messages[cut - 1]["tokens"] <= keep:
+            cut -= 1
+            kept += self.messages[cut]["tokens"]
+        # Always fold whole exchanges so the recent turns start with the user
+        if cut % 2:
+            cut += 1
+        return self.messages[:min(cut, len(self.messages))]
+
+    def apply_summary(self, summary: str, folded: int):
+        """Replace the first `folded` messages with `summary`"""
+        self.summary = summary.strip()
+        self.summary_tokens = estimate_tokens(self.summary)
+        del self.messages[:folded]
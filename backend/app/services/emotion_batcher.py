@@ -0,0 +1,83 @@
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import numpy as np
+
+
+class EmotionBatcher:
+    """Micro-batch face crops from all sessions into single classifier calls.
+
+    Crops are collected until either max_batch_size is reached or max_wait
+    seconds have passed since the first crop arrived, then the whole batch is
+    classified in one forward pass on the inference executor.
+    """
+
+    def __init__(self, executor: Executor, classify_fn: Callable[[List[np.ndarray]], List[Dict]],
+                 max_batch_size: int = 8, max_wait: float = 0.01):
+        self.executor = executor
+        self.classify_fn = classify_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+
+        self._pending: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = set()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    async def classify(self, face: np.ndarray) -> Dict:
+        """Queue a face crop and wait for its emotion scores"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((face, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[np.ndarray, asyncio.Future]]):
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+        try:
+            results = await loop.run_in_executor(
+                self.executor, self.classify_fn, [face for face, _ in batch]
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Futures of sessions that disconnected meanwhile are already cancelled
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "faces_classified": self.items,
+            "average_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+            "largest_batch": self.largest_batch
+        }
@@ -3,103 +3,211 @@ import cv2
 import numpy as np
 from typing import Dict, List, Optional
 from datetime import datetime
+from app.config import config
+from app.services.emotion_timeline import EMOTION_LABELS, EmotionTimeline
+import threading
+
+# Models are loaded once per process and shared by every session.
+# OpenCV cascades are not safe to share between threads, so each
+# inference worker thread keeps its own copy of the (small) detector.
+_detector_local = threading.local()
+_model_lock = threading.Lock()
+_emotion_model = None
+
+
+def get_face_detector() -> cv2.CascadeClassifier:
+    """Return this thread's cached Haar cascade face detector"""
+    detector = getattr(_detector_local, "face_cascade", None)
+    if detector is None:
+        detector = cv2.CascadeClassifier(
+            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        )
+        _detector_local.face_cascade = detector
+    return detector
+
+
+def get_emotion_model():
+    """Build the DeepFace emotion model once per process"""
+    global _emotion_model
+    if _emotion_model is None:
+        with _model_lock:
+            if _emotion_model is None:
+                try:
+                    _emotion_model = DeepFace.build_model(model_name="Emotion", task="facial_attribute")
+                except TypeError:
+                    # deepface < 0.0.90 has no task argument
+                    _emotion_model = DeepFace.build_model("Emotion")
+    return _emotion_model
+
+
+def predict_emotions(faces: np.ndarray) -> np.ndarray:
+    """Run the emotion classifier on a (n, 48, 48, 1) batch of grayscale faces scaled to 0-1"""
+    model = get_emotion_model()
+    # Newer deepface wraps the Keras model in a client object
+    keras_model = getattr(model, "model", model)
+    return np.asarray(keras_model.predict_on_batch(faces))
+
+
+def load_models() -> bool:
+    """Load the detector and emotion model, then run one warm-up inference"""
+    get_face_detector()
+    predict_emotions(np.zeros((1, 48, 48, 1), dtype=np.float32))
+    return True
+
 
 class EmotionService:
     def __init__(self):
-        self.emotions = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+        self.emotions = list(EMOTION_LABELS)
         print("Emotion Detection Model Loading")
 
-    def analyze_frame(self, frame: np.ndarray) -> Optional[Dict]:
-        try:
-            face_cascade = cv2.CascadeClassifier(
-                cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-            )
+    def no_face_result(self) -> Dict:
+        return {
+            'emotions': None,
+            'dominant_emotion': None,
+            'confidence': 0.0,
+            'face_detected': False,
+            'bounding_box': None,
+            'timestamp': datetime.now().isoformat()
+        }
 
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, 1.1, 5, minSize=(30, 30))
+    def detect_face(self, frame: np.ndarray, track: Optional[Dict] = None) -> Optional[Dict]:
+        """Find the user's face in a BGR or grayscale frame. Returns its bounding box, model-ready crop and
+        updated track, or None if no face was found.
 
-            if len(faces) == 0:
+        With a track from the previous frame only the region around the last box is searched;
+        the full frame is scanned when the track is lost or every FACE_REDETECT_INTERVAL frames.
+        """
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        if config.FACE_TRACKING and track and track["frames_since_detection"] < config.FACE_REDETECT_INTERVAL:
+            bounding_box = self._detect_in_region(gray, track["bounding_box"])
+            if bounding_box is not None:
                 return {
-                    'emotions': None,
-                    'dominant_emotion': None,
-                    'confidence': 0.0,
-                    'face_detected': False,
-                    'bounding_box': None,
-                    'timestamp': datetime.now().isoformat()
+                    'bounding_box': bounding_box,
+                    'face': self.preprocess_face(gray, bounding_box),
+                    'track': {
+                        'bounding_box': bounding_box,
+                        'frames_since_detection': track["frames_since_detection"] + 1
+                    }
                 }
 
-            (x, y, w, h) = faces[0]
-            bounding_box = [int(x), int(y), int(w), int(h)]
+        bounding_box = self._detect_full_frame(gray)
+        if bounding_box is None:
+            return None
 
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return {
+            'bounding_box': bounding_box,
+            'face': self.preprocess_face(gray, bounding_box),
+            'track': {'bounding_box': bounding_box, 'frames_since_detection': 0}
+        }
 
-            result = DeepFace.analyze(
-                frame_rgb,
-                actions=["emotion"],
-                enforce_detection=False,
-                detector_backend="skip",
-                silent=True
+    def _detect_full_frame(self, gray: np.ndarray) -> Optional[List[int]]:
+        face_cascade = get_face_detector()
+
+        # Detect on a downscaled copy, the cascade doesn't need full resolution
+        height, width = gray.shape[:2]
+        scale = min(1.0, config.FACE_DETECTION_WIDTH / float(width))
+        small = gray if scale == 1.0 else cv2.resize(
+            gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA
+        )
+        min_size = max(24, int(30 * scale))
+        faces = face_cascade.detectMultiScale(small, 1.1, 5, minSize=(min_size, min_size))
+
+        if len(faces) == 0:
+            return None
+
+        return [int(round(v / scale)) for v in faces[0]]
+
+    def _detect_in_region(self, gray: np.ndarray, last_box: List[int]) -> Optional[List[int]]:
+        """Look for the face near its last position, only at sizes close to the last one"""
+        face_cascade = get_face_detector()
+
+        x, y, w, h = last_box
+        margin_x = int(w * config.FACE_TRACK_SEARCH_MARGIN)
+        margin_y = int(h * config.FACE_TRACK_SEARCH_MARGIN)
+        height, width = gray.shape[:2]
+        x1, y1 = max(0, x - margin_x), max(0, y - margin_y)
+        x2, y2 = min(width, x + w + margin_x), min(height, y + h + margin_y)
+        region = gray[y1:y2, x1:x2]
+        if region.size == 0:
+            return None
+
+        # Shrink the region so the face is about FACE_TRACK_FACE_WIDTH pixels wide
+        scale = min(1.0, config.FACE_TRACK_FACE_WIDTH / float(w))
+        if scale < 1.0:
+            region = cv2.resize(
+                region, (max(1, int(region.shape[1] * scale)), max(1, int(region.shape[0] * scale))),
+                interpolation=cv2.INTER_AREA
             )
 
-            # DeepFace returns a list of results
-            analysis = result[0] if isinstance(result, list) else result
+        expected = w * scale
+        min_size = max(24, int(expected * 0.6))
+        max_size = max(min_size + 1, int(expected * 1.5))
+        faces = face_cascade.detectMultiScale(
+            region, 1.1, 5, minSize=(min_size, min_size), maxSize=(max_size, max_size)
+        )
 
-            emotions = analysis.get('emotion', {})
-            # Normalize scores to 0-1 range and convert numpy float32 to Python float
-            emotion_scores = {k: float(v / 100.0) for k, v in emotions.items()}
-            dominant = str(analysis.get('dominant_emotion', 'neutral'))
-            confidence = float(emotion_scores.get(dominant, 0.0))
+        if len(faces) == 0:
+            return None
 
-            return {
-                'emotions': emotion_scores,
-                'dominant_emotion': dominant,
-                'confidence': confidence,
-                'face_detected': True,
-                'bounding_box': bounding_box,
-                'timestamp': datetime.now().isoformat()
-            }
-
-        except Exception as e:
-            print(f"Error in emotion analysis: {str(e)}")
-            return {
-                'emotions': None,
-                'dominant_emotion': None,
-                'confidence': 0.0,
-                'face_detected': False,
-                'bounding_box': None,
-                'timestamp': datetime.now().isoformat()
-            }
-
-    def calculate_summary(self, emotion_timeline: List[Dict]) -> Dict:
-        if not emotion_timeline:
-            return {}
+        fx, fy, fw, fh = (int(round(v / scale)) for v in faces[0])
+        return [x1 + fx, y1 + fy, fw, fh]
 
-        valid_entries = [
-            entry for entry in emotion_timeline
-            if entry.get('face_detected') and entry.get('emotions')
-        ]
+    def preprocess_face(self, gray: np.ndarray, bounding_box: List[int]) -> np.ndarray:
+        """Crop the face with a margin and shrink it to the classifier's 48x48 grayscale input"""
+        x, y, w, h = bounding_box
+        margin_x = int(w * config.FACE_CROP_MARGIN)
+        margin_y = int(h * config.FACE_CROP_MARGIN)
 
-        if not valid_entries:
-            return {}
+        height, width = gray.shape[:2]
+        x1, y1 = max(0, x - margin_x), max(0, y - margin_y)
+        x2, y2 = min(width, x + w + margin_x), min(height, y + h + margin_y)
 
-        emotion_sums = {}
-        for entry in valid_entries:
-            for emotion, score in entry['emotions'].items():
-                emotion_sums[emotion] = emotion_sums.get(emotion, 0) + score
+        return cv2.resize(gray[y1:y2, x1:x2], (48, 48), interpolation=cv2.INTER_AREA)
 
-        count = len(valid_entries)
-        emotion_averages = {
-            emotion: float(sum_val / count)
-            for emotion, sum_val in emotion_sums.items()
-        }
+    def classify_faces(self, faces: List[np.ndarray]) -> List[Dict]:
+        """Classify a batch of 48x48 grayscale face crops with a single forward pass"""
+        batch = np.stack(faces).astype(np.float32)[..., np.newaxis]
+        batch /= 255.0
 
-        dominant = max(emotion_averages, key=emotion_averages.get)
+        results = []
+        for scores in predict_emotions(batch):
+            # Normalize scores to 0-1 range and convert numpy float32 to Python float
+            total = float(scores.sum()) or 1.0
+            emotion_scores = {label: float(score / total) for label, score in zip(self.emotions, scores)}
+            dominant = max(emotion_scores, key=emotion_scores.get)
+            results.append({
+                'emotions': emotion_scores,
+                'dominant_emotion': dominant,
+                'confidence': emotion_scores[dominant]
+            })
+        return results
 
+    def build_result(self, bounding_box: List[int], emotion: Dict) -> Dict:
         return {
-            'averages': emotion_averages,
-            'dominant': str(dominant),
-            'total': len(emotion_timeline),
-            'frames_with_faces': len(valid_entries),
-            'confidence': float(emotion_averages.get(dominant, 0)),
-            'detections': float(len(valid_entries) / len(emotion_timeline))
+            'emotions': emotion['emotions'],
+            'dominant_emotion': emotion['dominant_emotion'],
+            'confidence': emotion['confidence'],
+            'face_detected': True,
+            'bounding_box': bounding_box,
+            'timestamp': datetime.now().isoformat()
         }
+
+    def analyze_frame(self, frame: np.ndarray) -> Optional[Dict]:
+        try:
+            face = self.detect_face(frame)
+            if face is None:
+                return self.no_face_result()
+
+            emotion = self.classify_faces([face['face']])[0]
+            return self.build_result(face['bounding_box'], emotion)
+
+        except Exception as e:
+            print(f"Error in emotion analysis: {str(e)}")
+            return self.no_face_result()
+
+    def calculate_summary(self, emotion_timeline: EmotionTimeline) -> Dict:
+        """Emotion averages for a session; the timeline keeps running sums so this is O(1)"""
+        if emotion_timeline is None:
+            return {}
+        return emotion_timeline.summary()
@@ -0,0 +1,105 @@
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+import numpy as np
+
+EMOTION_LABELS = ("angry", "disgust", "fear", "happy", "sad", "surprise", "neutral")
+
+
+def timeline_dtype(n_labels: int) -> np.dtype:
+    return np.dtype([
+        ("timestamp", "f8"),           # Unix time the frame was analyzed
+        ("face", "?"),                 # Whether a face was found
+        ("scores", "f4", (n_labels,)), # Normalized score per emotion label
+        ("box", "i4", (4,)),           # x, y, w, h in client frame pixels
+    ])
+
+
+class EmotionTimeline:
+    """Per-session emotion results stored as rows of a NumPy structured array.
+
+    A row takes ~50 bytes instead of a dict of dicts and strings. The array
+    doubles as it fills, up to `max_samples`, after which it becomes a ring
+    buffer overwriting the oldest rows. Running sums of the scores are kept as
+    rows come and go, so `summary` costs the same at any length.
+    """
+
+    def __init__(self, labels: Sequence[str] = EMOTION_LABELS, capacity: int = 64,
+                 max_samples: Optional[int] = None):
+        self.labels = tuple(labels)
+        self.max_samples = max_samples
+        initial = max(1, min(capacity, max_samples) if max_samples else capacity)
+        self._rows = np.zeros(initial, dtype=timeline_dtype(len(self.labels)))
+        self._start = 0   # Index of the oldest row once the ring has wrapped
+        self._count = 0
+        self._score_sums = np.zeros(len(self.labels), dtype=np.float64)
+        self._faces = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        return self._rows.nbytes
+
+    def append(self, result: Dict):
+        """Add one analyzed frame, in the dict form EmotionService returns"""
+        emotions = result.get("emotions") if result.get("face_detected") else None
+        scores = np.array([emotions.get(label, 0.0) for label in self.labels], dtype=np.float32) if emotions else None
+
+        if self._count == len(self._rows):
+            if self.max_samples is None or len(self._rows) < self.max_samples:
+                self._grow()
+            else:
+                self._drop_oldest()
+
+        row = self._rows[(self._start + self._count) % len(self._rows)]
+        row["timestamp"] = datetime.now().timestamp()
+        row["face"] = scores is not None
+        row["scores"] = scores if scores is not None else 0.0
+        row["box"] = result.get("bounding_box") or (0, 0, 0, 0)
+        self._count += 1
+
+        if scores is not None:
+            self._score_sums += scores
+            self._faces += 1
+
+    def _grow(self):
+        size = len(self._rows) * 2
+        if self.max_samples is not None:
+            size = min(size, self.max_samples)
+        rows = np.zeros(size, dtype=self._rows.dtype)
+        rows[:self._count] = self.as_array()
+        self._rows = rows
+        self._start = 0
+
+    def _drop_oldest(self):
+        oldest = self._rows[self._start]
+        if oldest["face"]:
+            self._score_sums -= oldest["scores"]
+            self._faces -= 1
+        self._start = (self._start + 1) % len(self._rows)
+        self._count -= 1
+
+    def as_array(self) -> np.ndarray:
+        """Rows in the order they were added"""
+        end = self._start + self._count
+        if end <= len(self._rows):
+            return self._rows[self._start:end]
+        return np.concatenate([self._rows[self._start:], self._rows[:end - len(self._rows)]])
+
+    def summary(self) -> Dict:
+        """Average score per emotion over frames with a face, from the running sums"""
+        if not self._count or not self._faces:
+            return {}
+
+        averages = self._score_sums / self._faces
+        dominant = int(np.argmax(averages))
+
+        return {
+            'averages': {label: float(value) for label, value in zip(self.labels, averages)},
+            'dominant': self.labels[dominant],
+            'total': self._count,
+            'frames_with_faces': self._faces,
+            'confidence': float(averages[dominant]),
+            'detections': float(self._faces / self._count)
+        }
@@ -0,0 +1,63 @@
+from typing import Dict, Optional
+
+
+class FrameRateController:
+    """Decide how often each client should send video frames.
+
+    The interval follows each session's measured inference latency and is
+    stretched further while the shared inference pool is overloaded. A new
+    interval is only reported when it moves by more than `hysteresis`, so
+    clients aren't flooded with control messages. By default clients are only
+    ever slowed down; a `min_interval` below `default_interval` lets lightly
+    loaded sessions send faster.
+    """
+
+    def __init__(self, default_interval: float = 1.0, min_interval: Optional[float] = None,
+                 max_interval: float = 5.0, headroom: float = 2.0,
+                 smoothing: float = 0.3, hysteresis: float = 0.2):
+        self.default_interval = default_interval
+        self.min_interval = default_interval if min_interval is None else min_interval
+        self.max_interval = max_interval
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.hysteresis = hysteresis
+        self._sessions: Dict[str, Dict] = {}
+
+    def start(self, session_id: str) -> float:
+        self._sessions[session_id] = {"latency": None, "interval": self.default_interval}
+        return self.default_interval
+
+    def record(self, session_id: str, latency: float, pool_load: float) -> Optional[float]:
+        """Record a frame's end-to-end latency. Returns a new interval if the client should change pace."""
+        state = self._sessions.setdefault(session_id, {"latency": None, "interval": self.default_interval})
+
+        if state["latency"] is None:
+            state["latency"] = latency
+        else:
+            state["latency"] += self.smoothing * (latency - state["latency"])
+
+        # Leave room for one frame to finish before the next arrives,
+        # and back off proportionally when the pool has more work than workers
+        target = max(self.min_interval, state["latency"] * self.headroom)
+        if pool_load > 1.0:
+            target *= pool_load
+        target = round(min(self.max_interval, target), 2)
+
+        if abs(target - state["interval"]) <= state["interval"] * self.hysteresis:
+            return None
+
+        state["interval"] = target
+        return target
+
+    def discard(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict:
+        intervals = [s["interval"] for s in self._sessions.values()]
+        latencies = [s["latency"] for s in self._sessions.values() if s["latency"] is not None]
+        return {
+            "sessions": len(self._sessions),
+            "average_interval": round(sum(intervals) / len(intervals), 3) if intervals else None,
+            "max_interval": max(intervals) if intervals else None,
+            "average_latency_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None
+        }
@@ -0,0 +1,66 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import hashlib
+
+
+class HistoryCache:
+    """Serialized responses of the session history API, with their ETags.
+
+    History only changes when sessions are written, so instead of a TTL every
+    entry records the `version` it was built at and `invalidate` bumps the
+    version on each write. Entries from an older version are treated as
+    misses. Bodies are kept as JSON bytes, so a hit costs neither a query nor
+    serialization, and the ETag is a hash of the body.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max(1, max_entries)
+        self.version = 0
+        self._entries: "OrderedDict[str, Tuple[int, bytes, str]]" = OrderedDict()  # key -> (version, body, etag)
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        print(f"HistoryCache initialized (entries: {self.max_entries})")
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Body and ETag for `key`, if cached since the last write"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != self.version:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def put(self, key: str, body: bytes, version: int) -> str:
+        """Store a body built at `version` and return its ETag"""
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        # Skip bodies that were built while a write landed; they may already be stale
+        if version == self.version:
+            self._entries[key] = (version, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+    def invalidate(self, *_):
+        """Mark every cached response stale; called after sessions are written"""
+        self.version += 1
+        self.invalidations += 1
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations
+        }
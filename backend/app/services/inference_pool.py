@@ -0,0 +1,141 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple, Union
+import asyncio
+import multiprocessing
+
+# args may be a callable returning the args, resolved just before the job runs
+Job = Tuple[Callable, Union[tuple, Callable[[], tuple]], Callable[[Any], Awaitable[None]]]
+
+
+class InferencePool:
+    """Run CPU-bound model inference off the event loop.
+
+    Jobs run on a shared thread or process pool. Each session has its own
+    bounded queue of pending jobs; when a session submits faster than the pool
+    keeps up, the oldest pending job is dropped so only fresh frames get analyzed.
+    """
+
+    def __init__(self, max_workers: int = 2, queue_size: int = 1, kind: str = "thread"):
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.queue_size = max(1, queue_size)
+        self.executor = self._create_executor()
+
+        self._queues: Dict[str, Deque[Job]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._dropped_by_session: Dict[str, int] = {}
+        self.in_flight = 0
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        print(f"InferencePool initialized ({self.kind}, workers: {self.max_workers}, queue size: {self.queue_size})")
+
+    def _create_executor(self) -> Executor:
+        if self.kind == "process":
+            # Spawn rather than fork so workers don't inherit model/thread state
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+
+    async def warm_up(self, fn: Callable):
+        """Run fn once per worker so every worker has its models loaded before traffic arrives"""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(self.executor, fn)
+            for _ in range(self.max_workers)
+        ])
+
+    def submit(self, session_id: str, fn: Callable, args: Union[tuple, Callable[[], tuple]],
+               on_result: Callable[[Any], Awaitable[None]]) -> bool:
+        """Queue fn(*args) for a session. Returns False if an older job was dropped to make room.
+
+        Pass a callable as `args` for state that the session's previous job may
+        still change; it is called on the event loop when this job is dispatched.
+        """
+        queue = self._queues.setdefault(session_id, deque())
+        accepted = True
+
+        if len(queue) >= self.queue_size:
+            queue.popleft()
+            self.dropped += 1
+            self._dropped_by_session[session_id] = self._dropped_by_session.get(session_id, 0) + 1
+            accepted = False
+
+        queue.append((fn, args, on_result))
+        self.submitted += 1
+
+        worker = self._workers.get(session_id)
+        if worker is None or worker.done():
+            self._workers[session_id] = asyncio.create_task(self._drain(session_id))
+
+        return accepted
+
+    async def _drain(self, session_id: str):
+        """Process a session's queue one job at a time so results stay in order"""
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(session_id)
+
+        while queue:
+            fn, args, on_result = queue.popleft()
+            self.in_flight += 1
+            try:
+                if callable(args):
+                    args = args()
+                result = await loop.run_in_executor(self.executor, fn, *args)
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Inference error for session {session_id}: {str(e)}")
+                self.failed += 1
+                result = None
+            finally:
+                self.in_flight -= 1
+
+            try:
+                await on_result(result)
+            except Exception as e:
+                print(f"Error delivering inference result for session {session_id}: {str(e)}")
+
+    def load(self) -> float:
+        """Running plus waiting jobs per worker; above 1.0 the pool is saturated"""
+        queued = sum(len(q) for q in self._queues.values())
+        return (self.in_flight + queued) / self.max_workers
+
+    def queue_depth(self, session_id: str) -> int:
+        return len(self._queues.get(session_id, ()))
+
+    def discard(self, session_id: str):
+        """Drop pending jobs for a session and stop its worker"""
+        self._queues.pop(session_id, None)
+        self._dropped_by_session.pop(session_id, None)
+        worker = self._workers.pop(session_id, None)
+        if worker is not None and not worker.done():
+            worker.cancel()
+
+    def stats(self) -> Dict:
+        """Pool load, queue depth and drop counts for capacity planning"""
+        return {
+            "executor": self.kind,
+            "workers": self.max_workers,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "load": round(self.load(), 2),
+            "queued": sum(len(q) for q in self._queues.values()),
+            "sessions": len(self._queues),
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "queue_depth_by_session": {sid: len(q) for sid, q in self._queues.items()},
+            "dropped_by_session": dict(self._dropped_by_session)
+        }
+
+    def shutdown(self, wait: bool = False):
+        for session_id in list(self._workers):
+            self.discard(session_id)
+        self.executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,210 @@
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import asyncio
+import json
+import os
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from app.models.session import AsyncSessionModel
+
+
+class PersistenceQueue:
+    """Write-behind queue for completed debate sessions.
+
+    Records are queued in memory and inserted in one transaction per batch,
+    when `batch_size` records are waiting or every `flush_interval` seconds.
+    If the database can't be reached, the batch is appended to a JSONL
+    journal on disk (fsynced) and replayed once the database is back, and on
+    the next startup. `stop` flushes whatever is still queued. `on_write` is
+    called with the number of sessions after each batch that reaches the
+    database.
+    """
+
+    def __init__(self, batch_size: int = 20, flush_interval: float = 2.0,
+                 journal_path: Optional[str] = None, on_write: Optional[Callable[[int], None]] = None):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path
+        self.on_write = on_write
+        self._pending: List[Dict] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.written = 0
+        self.batches = 0
+        self.journaled = 0
+        self.replayed = 0
+        self.duplicates = 0
+        self.last_flush_ms = 0.0
+        self.last_error: Optional[str] = None
+        print(f"PersistenceQueue initialized (batch size: {self.batch_size}, "
+              f"flush interval: {self.flush_interval:g}s, journal: {self.journal_path})")
+
+    async def start(self):
+        """Replay anything left in the journal, then start flushing in the background"""
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._stopping = False
+        await self.replay_journal()
+        self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, record: Dict):
+        """Queue a session row; returns immediately"""
+        record.setdefault("created_at", datetime.utcnow().isoformat())
+        self._pending.append(record)
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                if self.journal_path and os.path.exists(self.journal_path):
+                    await self.replay_journal()
+                await self.flush()
+            except Exception as e:
+                print(f"Error in persistence queue: {str(e)}")
+
+    async def flush(self):
+        """Write everything queued so far, in batches"""
+        async with self._lock:
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                try:
+                    if not await self._write(batch):
+                        await self._journal(batch)
+                except asyncio.CancelledError:
+                    # Don't lose the batch; a retry of rows that did commit counts as duplicates
+                    self._pending[:0] = batch
+                    raise
+
+    async def _write(self, batch: List[Dict]) -> bool:
+        """Insert a batch in one transaction. Returns False if the database is unavailable.
+
+        When a write fails partway through the row-by-row retry, rows already
+        written are removed from `batch` so only the rest get journaled.
+        """
+        start = time.perf_counter()
+        try:
+            self._record_written(await AsyncSessionModel.create_sessions(batch))
+        except IntegrityError:
+            # One bad row (usually a duplicate session id) shouldn't sink the batch
+            while batch:
+                try:
+                    self._record_written(await AsyncSessionModel.create_sessions(batch[:1]))
+                except IntegrityError:
+                    # Every debate has its own key, so this row was already written (a journal replay)
+                    print(f"Session {batch[0].get('session_id')} is already saved, skipping")
+                    self.duplicates += 1
+                except Exception as e:
+                    self._unavailable(batch, e)
+                    return False
+                del batch[0]
+        except Exception as e:
+            self._unavailable(batch, e)
+            return False
+
+        self.batches += 1
+        self.last_flush_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.last_error = None
+        return True
+
+    def _record_written(self, count: int):
+        self.written += count
+        if count and self.on_write is not None:
+            self.on_write(count)
+
+    def _unavailable(self, batch: List[Dict], error: Exception):
+        self.last_error = str(error)
+        print(f"Database unavailable, journaling {len(batch)} sessions: {str(error)}")
+
+    async def _journal(self, batch: List[Dict]):
+        if not self.journal_path:
+            print(f"No journal configured, {len(batch)} sessions were not saved")
+            return
+        await asyncio.to_thread(self._append_journal, batch)
+        self.journaled += len(batch)
+
+    def _append_journal(self, batch: List[Dict]):
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            for record in batch:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read_journal(self) -> List[Dict]:
+        records = []
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn last line from a crash mid-write
+                        print("Skipping unreadable journal line")
+        return records
+
+    async def replay_journal(self):
+        """Insert journaled sessions; the journal is removed once all of them are written"""
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return
+        async with self._lock:
+            records = await asyncio.to_thread(self._read_journal)
+            for i in range(0, len(records), self.batch_size):
+                batch = records[i:i + self.batch_size]
+                if not await self._write(batch):
+                    # Still unavailable; rewrite the journal with what's left
+                    remaining = batch + records[i + self.batch_size:]
+                    await asyncio.to_thread(self._rewrite_journal, remaining)
+                    return
+                self.replayed += len(records[i:i + self.batch_size])
+            os.remove(self.journal_path)
+            if records:
+                print(f"Replayed {len(records)} journaled sessions")
+
+    def _rewrite_journal(self, records: List[Dict]):
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    async def stop(self):
+        """Stop the flush loop and write out whatever is still queued"""
+        if self._task is not None:
+            # Let a write in progress finish rather than cancelling it halfway
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self._lock is not None:
+            await self.flush()
+
+    def stats(self) -> Dict:
+        journal_bytes = os.path.getsize(self.journal_path) if self.journal_path and os.path.exists(self.journal_path) else 0
+        return {
+            "queued": len(self._pending),
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "written": self.written,
+            "batches": self.batches,
+            "duplicates": self.duplicates,
+            "journaled": self.journaled,
+            "replayed": self.replayed,
+            "journal_bytes": journal_bytes,
+            "last_flush_ms": self.last_flush_ms,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,143 @@
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Process-wide token bucket for calls to a rate-limited API.
+
+    Tokens refill at `rate_per_minute` up to `burst`. Callers that find the
+    bucket empty wait in per-session queues which are served round-robin, so a
+    session sending many requests can't starve the others. When the API says
+    it is over quota, `pause` holds every request back until the hinted time.
+    """
+
+    def __init__(self, rate_per_minute: float = 30, burst: int = 5, wait_samples: int = 500):
+        self.rate = max(rate_per_minute, 0.001) / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self._waits: Deque[float] = deque(maxlen=wait_samples)
+        self.granted = 0
+        self.queued_total = 0
+        self.max_wait = 0.0
+        self.pauses = 0
+        print(f"RateLimiter initialized ({rate_per_minute:g}/min, burst {self.capacity})")
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _queued(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    async def acquire(self, session_id: str):
+        """Wait for a token, taking turns with other sessions"""
+        now = time.monotonic()
+        self._refill(now)
+
+        if not self._queues and now >= self._paused_until and self.tokens >= 1:
+            self.tokens -= 1
+            self._record_wait(0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session_id, deque()).append(future)
+        self.queued_total += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._remove(session_id, future)
+            raise
+        self._record_wait(time.monotonic() - now)
+
+    def _remove(self, session_id: str, future: asyncio.Future):
+        queue = self._queues.get(session_id)
+        if queue is None:
+            return
+        if future in queue:
+            queue.remove(future)
+        if not queue:
+            del self._queues[session_id]
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        """Head of the next session's queue; that session then moves to the back of the line"""
+        while self._queues:
+            session_id, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            if queue:
+                self._queues.move_to_end(session_id)
+            else:
+                del self._queues[session_id]
+            if not future.done():
+                return future
+        return None
+
+    async def _dispatch(self):
+        while self._queues:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            self._refill(now)
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+
+            future = self._next_waiter()
+            if future is not None:
+                self.tokens -= 1
+                future.set_result(None)
+
+    def pause(self, seconds: float):
+        """Hold back every request for `seconds`, e.g. after the API returned 429"""
+        until = time.monotonic() + seconds
+        if until > self._paused_until:
+            self._paused_until = until
+            self.pauses += 1
+        # The bucket was evidently fuller than the real quota; let one request
+        # probe after the pause and pace the rest
+        self.tokens = min(self.tokens, 1.0)
+
+    def _record_wait(self, wait: float):
+        self.granted += 1
+        self._waits.append(wait)
+        self.max_wait = max(self.max_wait, wait)
+
+    def stats(self) -> Dict:
+        """Bucket level, queue length and how long requests waited for a token"""
+        self._refill(time.monotonic())
+        waits = sorted(self._waits)
+
+        def percentile(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1)
+
+        return {
+            "rate_per_minute": round(self.rate * 60, 2),
+            "burst": self.capacity,
+            "tokens": round(self.tokens, 2),
+            "queued": self._queued(),
+            "queued_sessions": len(self._queues),
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "pauses": self.pauses,
+            "granted": self.granted,
+            "queued_total": self.queued_total,
+            "wait_ms": {
+                "avg": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": round(self.max_wait * 1000, 1)
+            }
+        }
@@ -0,0 +1,82 @@
+from typing import Optional, Union
+import os
+import tempfile
+
+
+class RecordingBuffer:
+    """
+    Accumulates a session's recorded audio. Small recordings stay in memory;
+    once the recording grows past spill_threshold it is moved to a temp file
+    and further chunks are appended there. Analyzers read it by path.
+    """
+
+    def __init__(self, spill_threshold: int, max_size: int,
+                 directory: Optional[str] = None, suffix: str = ".webm"):
+        self.spill_threshold = spill_threshold
+        self.max_size = max_size
+        self.directory = directory
+        self.suffix = suffix
+        self.size = 0
+        self.truncated = False  # Set once a chunk has been dropped for exceeding max_size
+        self.path: Optional[str] = None
+        self._memory = bytearray()
+        self._file = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held in memory; zero once spilled to disk"""
+        return len(self._memory)
+
+    def write(self, data: Union[bytes, memoryview]) -> bool:
+        """Append a chunk. Returns False (and drops the chunk) if it would exceed max_size.
+
+        Once a chunk has been dropped, later ones are dropped too, so the
+        recording doesn't resume with a gap.
+        """
+        if self.truncated or self.size + len(data) > self.max_size:
+            self.truncated = True
+            return False
+
+        if self._file is None and self.size + len(data) > self.spill_threshold:
+            self._spill()
+
+        if self._file is not None:
+            self._file.write(data)
+        else:
+            self._memory.extend(data)
+        self.size += len(data)
+        return True
+
+    def _spill(self):
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix="polly-recording-", suffix=self.suffix, dir=self.directory)
+        self._file = os.fdopen(fd, "wb")
+        self._file.write(self._memory)
+        self._memory = bytearray()
+
+    def as_path(self) -> str:
+        """Path of the complete recording on disk, writing it out first if it is still in memory"""
+        if self._file is None:
+            self._spill()
+        self._file.flush()
+        return self.path
+
+    def close(self):
+        """Release memory and delete the temp file"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+        self._memory = bytearray()
+        self.size = 0
+        self.truncated = False
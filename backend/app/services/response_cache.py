@@ -0,0 +1,165 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation so trivially different prompts match"""
+    text = re.sub(r"\s+", " ", prompt.lower()).strip()
+    return text.rstrip(" ?!.")
+
+
+class ResponseCache:
+    """TTL + LRU cache of model replies, optionally backed by SQLite.
+
+    Entries live in an in-memory LRU; with `path` set they are also written
+    to a SQLite file so they survive restarts, and memory misses fall back to
+    it. The file is only read and written in a worker thread, never on the
+    event loop: hits just note when they were used, and those times go out
+    with the next store. Rows beyond `max_entries` are pruned every
+    `prune_every` stores rather than on each one. Each entry remembers how
+    long the original request took, so hits can report the latency they
+    saved.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 86400, path: Optional[str] = None,
+                 prune_every: int = 32):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.path = path
+        self.prune_every = max(1, prune_every)
+        self._entries: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()  # key -> (reply, latency, created_at)
+        self._touched: Dict[str, float] = {}  # key -> last hit, not yet written to the file
+        self._puts_since_prune = 0
+        self._lock = threading.Lock()  # Guards the SQLite connection across worker threads
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, reply TEXT NOT NULL, latency REAL NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_last_used ON response_cache (last_used)")
+            self._db.execute("DELETE FROM response_cache WHERE created_at < ?", (time.time() - self.ttl,))
+            self._db.commit()
+
+        print(f"ResponseCache initialized (entries: {self.max_entries}, ttl: {self.ttl:g}s, "
+              f"backend: {'sqlite ' + path if path else 'memory'})")
+
+    @staticmethod
+    def make_key(prompt: str, **context) -> str:
+        """Hash of the normalized prompt plus whatever context the reply depends on"""
+        payload = json.dumps([normalize_prompt(prompt), context], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is None and self._db is not None:
+            entry = await asyncio.to_thread(self._read, key)
+            if entry is not None:
+                self._store(key, entry)
+
+        if entry is None or now - entry[2] > self.ttl:
+            if entry is not None:
+                self._entries.pop(key, None)
+                self._touched.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if self._db is not None:
+            self._touched[key] = now
+        self.hits += 1
+        self.latency_saved += entry[1]
+        return entry[0]
+
+    async def put(self, key: str, reply: str, latency: float):
+        """Store a reply along with how long it took to generate"""
+        now = time.time()
+        entry = (reply, latency, now)
+        self._store(key, entry)
+        if self._db is None:
+            return
+
+        touched, self._touched = self._touched, {}
+        self._puts_since_prune += 1
+        prune = self._puts_since_prune >= self.prune_every
+        if prune:
+            self._puts_since_prune = 0
+        await asyncio.to_thread(self._write, key, entry, touched, prune)
+
+    def _store(self, key: str, entry: Tuple[str, float, float]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read(self, key: str) -> Optional[Tuple[str, float, float]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT reply, latency, created_at FROM response_cache WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl)
+            ).fetchone()
+        return tuple(row) if row is not None else None
+
+    def _write(self, key: Optional[str], entry: Optional[Tuple[str, float, float]],
+               touched: Dict[str, float], prune: bool):
+        with self._lock:
+            if self._db is None:
+                return
+            if key is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, reply, latency, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, entry[0], entry[1], entry[2], entry[2])
+                )
+            if touched:
+                self._db.executemany(
+                    "UPDATE response_cache SET last_used = ? WHERE key = ?",
+                    [(used, k) for k, used in touched.items()]
+                )
+            if prune:
+                # Least recently used rows go once the file holds more than max_entries
+                self._db.execute(
+                    "DELETE FROM response_cache WHERE last_used < "
+                    "(SELECT last_used FROM response_cache ORDER BY last_used DESC LIMIT 1 OFFSET ?)",
+                    (self.max_entries - 1,)
+                )
+            self._db.commit()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite" if self._db is not None else "memory",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "latency_saved_s": round(self.latency_saved, 2)
+        }
+
+    def close(self):
+        """Write out pending hit times, prune and close the file"""
+        if self._db is not None:
+            touched, self._touched = self._touched, {}
+            self._write(None, None, touched, True)
+            with self._lock:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,127 @@
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+# Called with (session_id, session, reason) after a session is evicted
+EvictCallback = Callable[[str, dict, str], None]
+
+
+def estimate_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """Approximate bytes held by a session's state, following containers and numpy buffers"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, "nbytes") and not isinstance(obj, type):
+        # Objects like the recording buffer and emotion timeline report their own size
+        return int(obj.nbytes)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(estimate_size(v, _seen) for v in obj)
+    return size
+
+
+class SessionStore(MutableMapping):
+    """Per-session state with an idle timeout and a cap on live sessions.
+
+    Behaves like the plain dict it replaces. `touch` marks a session as
+    active; `reap` evicts sessions idle for longer than `idle_ttl`, and adding
+    a session beyond `max_sessions` evicts the least recently active one.
+    Evicted sessions are passed to `on_evict` so their other resources can be
+    released. Removing a session with `del` or `pop` does not call it.
+    """
+
+    def __init__(self, idle_ttl: float = 1800, max_sessions: int = 200,
+                 on_evict: Optional[EvictCallback] = None):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max(1, max_sessions)
+        self.on_evict = on_evict
+        self._sessions: "OrderedDict[str, dict]" = OrderedDict()
+        self._last_seen: Dict[str, float] = {}
+        self.evicted: Dict[str, int] = {"idle": 0, "capacity": 0}
+
+    def __getitem__(self, session_id: str) -> dict:
+        return self._sessions[session_id]
+
+    def __setitem__(self, session_id: str, session: dict):
+        self._sessions[session_id] = session
+        self.touch(session_id)
+        while len(self._sessions) > self.max_sessions:
+            oldest = next(iter(self._sessions))
+            self._evict(oldest, "capacity")
+
+    def __delitem__(self, session_id: str):
+        del self._sessions[session_id]
+        self._last_seen.pop(session_id, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sessions))
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def touch(self, session_id: str):
+        """Record activity; the least recently active session is first in line for eviction"""
+        if session_id in self._sessions:
+            self._last_seen[session_id] = time.monotonic()
+            self._sessions.move_to_end(session_id)
+
+    def idle_for(self, session_id: str) -> float:
+        return time.monotonic() - self._last_seen.get(session_id, time.monotonic())
+
+    def _evict(self, session_id: str, reason: str):
+        session = self._sessions.pop(session_id)
+        self._last_seen.pop(session_id, None)
+        self.evicted[reason] += 1
+        print(f"Session {session_id} evicted ({reason})")
+        if self.on_evict is not None:
+            try:
+                self.on_evict(session_id, session, reason)
+            except Exception as e:
+                print(f"Error cleaning up evicted session {session_id}: {str(e)}")
+
+    def reap(self) -> List[str]:
+        """Evict every session idle for longer than idle_ttl"""
+        now = time.monotonic()
+        # Sessions are kept in activity order, so stop at the first recent one
+        expired = []
+        for session_id in self._sessions:
+            if now - self._last_seen.get(session_id, now) <= self.idle_ttl:
+                break
+            expired.append(session_id)
+        for session_id in expired:
+            self._evict(session_id, "idle")
+        return expired
+
+    async def run_reaper(self, interval: float = 60):
+        while True:
+            await asyncio.sleep(interval)
+            self.reap()
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes of state held per session"""
+        return {session_id: estimate_size(session) for session_id, session in self._sessions.items()}
+
+    def stats(self) -> Dict:
+        usage = self.memory_usage()
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            "evicted": dict(self.evicted),
+            "memory_bytes": sum(usage.values()),
+            "memory_bytes_by_session": usage,
+            "idle_seconds_by_session": {sid: round(self.idle_for(sid), 1) for sid in self._sessions}
+        }
@@ -1,13 +1,14 @@
 from app.config import config
 import io
-from typing import Dict
+from typing import Dict, Optional, Union
 
 class SpeechService:
     def __init__(self):
         print("SpeechService initialized (using mock transcription).")
     
-    async def transcribe_audio(self, audio_data: bytes) -> Dict:
-        """Mock transcription - replace with Google Cloud Speech-to-Text if needed"""
+    async def transcribe_audio(self, audio_data: Optional[Union[bytes, str]]) -> Dict:
+        """Mock transcription - replace with Google Cloud Speech-to-Text if needed
+        audio_data is the encoded recording or a path to it"""
         
         return {
             "text": "Mock transcription: You presented a strong argument about the debate topic. Your main points were clear and well-structured. You maintained good pacing throughout your speech.",
@@ -1,69 +1,236 @@
 import librosa
 import numpy as np
-from typing import Dict
+from typing import Dict, Optional, Union
+from app.config import config
 import io
+import math
+
+# STFT frame size and hop shared by every voice feature
+N_FFT = 2048
+HOP_LENGTH = 512
+
+
+class RunningStats:
+    """Running mean and standard deviation, updated a batch at a time (Welford/Chan)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values: np.ndarray):
+        n = len(values)
+        if n == 0:
+            return
+
+        batch_mean = float(np.mean(values))
+        batch_m2 = float(np.sum((values - batch_mean) ** 2))
+        delta = batch_mean - self.mean
+        total = self.count + n
+
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+
+class VoiceStream:
+    """
+    Incremental voice analysis for PCM audio that arrives while recording.
+    Samples are buffered and analyzed in whole STFT frames once at least
+    batch_seconds of audio is waiting; partial frames carry over to the next batch.
+    """
+
+    def __init__(self, service: "VoiceAnalysisService", sample_rate: Optional[int] = None,
+                 batch_seconds: float = 2.0):
+        self.service = service
+        self.batch_seconds = batch_seconds
+        self.n_fft = N_FFT
+        self.hop_length = HOP_LENGTH
+        # None keeps the rate of the first chunk, otherwise chunks are resampled to it
+        self.sample_rate = sample_rate
+        self.samples_received = 0
+        self._buffer = np.zeros(0, dtype=np.float32)
+
+        self.pitch = RunningStats()
+        self.energy = RunningStats()
+        self.zcr = RunningStats()
+        self.centroid = RunningStats()
+
+    @property
+    def duration(self) -> float:
+        return self.samples_received / self.sample_rate if self.sample_rate else 0.0
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of audio waiting to be analyzed"""
+        return self._buffer.nbytes
+
+    def add(self, samples: np.ndarray, sample_rate: int) -> bool:
+        """Append a chunk of mono float samples. Returns True if the running statistics changed."""
+        if self.sample_rate is None:
+            self.sample_rate = sample_rate
+        elif sample_rate != self.sample_rate:
+            samples = librosa.resample(samples, orig_sr=sample_rate, target_sr=self.sample_rate)
+
+        self.samples_received += len(samples)
+        self._buffer = np.concatenate([self._buffer, samples.astype(np.float32, copy=False)])
+
+        if len(self._buffer) < self.sample_rate * self.batch_seconds:
+            return False
+        return self._process()
+
+    def _process(self) -> bool:
+        buffered = len(self._buffer)
+        if buffered < self.n_fft:
+            return False
+
+        # Analyze every complete frame; the overlap and leftover samples stay buffered
+        n_frames = 1 + (buffered - self.n_fft) // self.hop_length
+        end = (n_frames - 1) * self.hop_length + self.n_fft
+        features = self.service.extract_features(
+            self._buffer[:end], self.sample_rate, center=False
+        )
+        self._buffer = self._buffer[n_frames * self.hop_length:].copy()
+
+        self.pitch.update(features["pitch"])
+        self.energy.update(features["rms"])
+        self.zcr.update(features["zcr"])
+        self.centroid.update(features["spectral_centroid"])
+        return True
+
+    def snapshot(self) -> Dict:
+        """Analysis of everything received so far, in the same shape as analyze_audio"""
+        return self.service.build_analysis(
+            average_pitch=self.pitch.mean,
+            pitch_std=self.pitch.std,
+            average_energy=self.energy.mean,
+            energy_std=self.energy.std,
+            articulation_rate=self.zcr.mean,
+            brightness=self.centroid.mean,
+            duration=self.duration
+        )
+
+    def finish(self) -> Dict:
+        """Analyze the remaining buffered audio and return the final analysis"""
+        self._process()
+        return self.snapshot()
+
 
 class VoiceAnalysisService:
     def __init__(self):
         print("VoiceAnalysisService initialized.")
-    
-    def analyze_audio(self, audio_data: bytes) -> Dict:
+
+    def create_stream(self) -> VoiceStream:
+        return VoiceStream(
+            self,
+            sample_rate=config.VOICE_ANALYSIS_SAMPLE_RATE or None,
+            batch_seconds=config.VOICE_UPDATE_INTERVAL
+        )
+
+    def extract_features(self, y: np.ndarray, sr: int, center: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Frame-level pitch, energy, zero crossing rate and spectral centroid.
+        The signal is framed and transformed once; every metric is derived from
+        that shared STFT or from the same frame grid.
+        """
+        if center:
+            y = np.pad(y, N_FFT // 2)
+        if len(y) < N_FFT:
+            empty = np.zeros(0, dtype=np.float32)
+            return {"pitch": empty, "rms": empty, "zcr": empty, "spectral_centroid": empty}
+
+        spectrum = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH, center=False))
+
+        # 1. Pitch/Fundamental Frequency
+        pitches, magnitudes = librosa.piptrack(S=spectrum, sr=sr, n_fft=N_FFT, hop_length=HOP_LENGTH)
+        pitch_values = self._extract_pitch_values(pitches, magnitudes)
+        del pitches, magnitudes
+
+        # 2. Spectral Features (voice quality)
+        spectral_centroid = librosa.feature.spectral_centroid(S=spectrum, sr=sr, n_fft=N_FFT)[0]
+        del spectrum
+
+        # 3. Energy/Volume, from a strided view of the frames (no copy)
+        frames = librosa.util.frame(y, frame_length=N_FFT, hop_length=HOP_LENGTH)
+        rms = np.sqrt(np.einsum("ij,ij->j", frames, frames) / N_FFT)
+
+        # 4. Speaking Rate (zero crossing rate as proxy), counted once per sample
+        signs = np.signbit(np.where(np.abs(y) <= 1e-10, 0, y))
+        crossings = np.concatenate(([0], np.cumsum(signs[1:] != signs[:-1], dtype=np.int32)))
+        starts = np.arange(frames.shape[1]) * HOP_LENGTH
+        zcr = (crossings[starts + N_FFT - 1] - crossings[starts]) / N_FFT
+
+        return {
+            "pitch": pitch_values,
+            "rms": rms,
+            "zcr": zcr,
+            "spectral_centroid": spectral_centroid
+        }
+
+    def _extract_pitch_values(self, pitches: np.ndarray, magnitudes: np.ndarray) -> np.ndarray:
+        """Pick the strongest pitch candidate in each frame, skipping unvoiced frames"""
+        strongest = magnitudes.argmax(axis=0)
+        pitch = pitches[strongest, np.arange(pitches.shape[1])]
+        return pitch[pitch > 0]
+
+    def build_analysis(self, average_pitch: float, pitch_std: float, average_energy: float,
+                       energy_std: float, articulation_rate: float, brightness: float,
+                       duration: float) -> Dict:
+        analysis = {
+            "average_pitch": round(float(average_pitch), 2),
+            "pitch_variance": round(float(pitch_std), 2),
+            "average_energy": round(float(average_energy), 4),
+            "energy_variance": round(float(energy_std), 4),
+            "articulation_rate": round(float(articulation_rate), 4),
+            "voice_brightness": round(float(brightness), 2)
+        }
+
+        # 5. Confidence Indicators
+        # Higher energy + stable pitch = more confidence
+        analysis["confidence_score"] = self._calculate_confidence(
+            analysis["average_energy"],
+            analysis["pitch_variance"],
+            analysis["energy_variance"]
+        )
+
+        # 6. Duration
+        analysis["duration"] = round(float(duration), 2)
+
+        return analysis
+
+    def analyze_audio(self, audio_data: Optional[Union[bytes, str]]) -> Dict:
         """
         Analyze audio for tone, pitch, energy, and confidence indicators
+        audio_data is either the encoded audio or a path to it; paths avoid
+        copying long recordings and let librosa fall back to ffmpeg for WebM
         Note: This requires librosa to be installed
         """
         try:
-            # Load audio from bytes
-            audio_file = io.BytesIO(audio_data)
-            
-            # Load with librosa (will handle format conversion)
-            y, sr = librosa.load(audio_file, sr=None)
-            
-            # Calculate various audio features
-            analysis = {}
-            
-            # 1. Pitch/Fundamental Frequency
-            pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-            pitch_values = []
-            for t in range(pitches.shape[1]):
-                index = magnitudes[:, t].argmax()
-                pitch = pitches[index, t]
-                if pitch > 0:
-                    pitch_values.append(pitch)
-            
-            if pitch_values:
-                analysis["average_pitch"] = round(float(np.mean(pitch_values)), 2)
-                analysis["pitch_variance"] = round(float(np.std(pitch_values)), 2)
-            else:
-                analysis["average_pitch"] = 0
-                analysis["pitch_variance"] = 0
-            
-            # 2. Energy/Volume
-            rms = librosa.feature.rms(y=y)[0]
-            analysis["average_energy"] = round(float(np.mean(rms)), 4)
-            analysis["energy_variance"] = round(float(np.std(rms)), 4)
-            
-            # 3. Speaking Rate (zero crossing rate as proxy)
-            zcr = librosa.feature.zero_crossing_rate(y)[0]
-            analysis["articulation_rate"] = round(float(np.mean(zcr)), 4)
+            if not audio_data:
+                raise ValueError("No audio recorded")
+
+            # Load audio from a file path, or from bytes
+            audio_file = audio_data if isinstance(audio_data, str) else io.BytesIO(audio_data)
             
-            # 4. Spectral Features (voice quality)
-            spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
-            analysis["voice_brightness"] = round(float(np.mean(spectral_centroid)), 2)
+            # Load with librosa (will handle format conversion), resampled to the analysis rate
+            y, sr = librosa.load(audio_file, sr=config.VOICE_ANALYSIS_SAMPLE_RATE or None)
             
-            # 5. Confidence Indicators
-            # Higher energy + stable pitch = more confidence
-            confidence_score = self._calculate_confidence(
-                analysis["average_energy"],
-                analysis["pitch_variance"],
-                analysis["energy_variance"]
+            features = self.extract_features(y, sr)
+            pitch_values = features["pitch"]
+
+            return self.build_analysis(
+                average_pitch=np.mean(pitch_values) if len(pitch_values) else 0,
+                pitch_std=np.std(pitch_values) if len(pitch_values) else 0,
+                average_energy=np.mean(features["rms"]),
+                energy_std=np.std(features["rms"]),
+                articulation_rate=np.mean(features["zcr"]),
+                brightness=np.mean(features["spectral_centroid"]),
+                duration=len(y) / sr
             )
-            analysis["confidence_score"] = confidence_score
-            
-            # 6. Duration
-            analysis["duration"] = round(float(len(y) / sr), 2)
-            
-            return analysis
             
         except Exception as e:
             print(f"Error in voice analysis: {str(e)}")
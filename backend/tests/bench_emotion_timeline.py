@@ -0,0 +1,103 @@
+import argparse
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from app.services.emotion_timeline import EMOTION_LABELS, EmotionTimeline
+
+# Benchmark for the per-session emotion timeline.
+#
+# Compares the old list of result dicts, summarized by walking every entry,
+# against EmotionTimeline's structured array with running sums: memory held
+# per hour of recording and the cost of one summary.
+#
+#   cd backend && python -m tests.bench_emotion_timeline --minutes 10 60
+
+
+def make_results(n: int):
+    rng = np.random.default_rng(0)
+    scores = rng.dirichlet(np.ones(len(EMOTION_LABELS)), size=n)
+    for row in scores:
+        emotions = {label: float(v) for label, v in zip(EMOTION_LABELS, row)}
+        dominant = max(emotions, key=emotions.get)
+        yield {
+            'emotions': emotions,
+            'dominant_emotion': dominant,
+            'confidence': emotions[dominant],
+            'face_detected': True,
+            'bounding_box': [412, 188, 236, 236],
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+def dict_summary(emotion_timeline):
+    """calculate_summary as it was before the array-backed timeline"""
+    valid_entries = [e for e in emotion_timeline if e.get('face_detected') and e.get('emotions')]
+    emotion_sums = {}
+    for entry in valid_entries:
+        for emotion, score in entry['emotions'].items():
+            emotion_sums[emotion] = emotion_sums.get(emotion, 0) + score
+    count = len(valid_entries)
+    averages = {emotion: float(total / count) for emotion, total in emotion_sums.items()}
+    dominant = max(averages, key=averages.get)
+    return {'averages': averages, 'dominant': dominant}
+
+
+def measure_memory(build):
+    """Result of build() and the bytes it still holds"""
+    tracemalloc.start()
+    result = build()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, held
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(minutes_list, fps: float, repeat: int):
+    print(f"{fps:g} analyzed frames/s, best of {repeat}\n")
+    print(f"{'length':>8} {'frames':>8} {'dicts':>10} {'array':>10} {'dict summary':>13} {'array summary':>14}")
+
+    for minutes in minutes_list:
+        n = int(minutes * 60 * fps)
+
+        dicts, dict_bytes = measure_memory(lambda: list(make_results(n)))
+
+        def build_timeline():
+            timeline = EmotionTimeline()
+            for result in make_results(n):
+                timeline.append(result)
+            return timeline
+        timeline, array_bytes = measure_memory(build_timeline)
+
+        old, new = dict_summary(dicts), timeline.summary()
+        assert old['dominant'] == new['dominant']
+        assert all(abs(old['averages'][k] - new['averages'][k]) < 1e-5 for k in EMOTION_LABELS)
+
+        dict_time = timed(lambda: dict_summary(dicts), repeat)
+        array_time = timed(timeline.summary, repeat)
+
+        print(f"{minutes:>6g} m {n:>8} {dict_bytes / 2**20:>8.1f}MiB {array_bytes / 2**20:>8.2f}MiB "
+              f"{dict_time * 1000:>11.2f}ms {array_time * 1e6:>12.1f}us")
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--minutes", type=float, nargs="+", default=[10, 60], help="Recording lengths to test")
+    p.add_argument("--fps", type=float, default=1.0, help="Analyzed frames per second")
+    p.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is reported)")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.minutes, args.fps, args.repeat)
@@ -0,0 +1,116 @@
+import argparse
+import base64
+import time
+import tracemalloc
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Microbenchmark for the WebSocket frame decode path.
+#
+# Compares the old path (base64 -> PIL -> RGB->BGR -> BGR->gray) against
+# cv2.imdecode straight to grayscale, from base64 JSON and from binary frames.
+#
+#   python tests/bench_frame_decode.py --image face.jpg --iterations 200
+
+DECODE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+def make_test_jpeg(width: int, height: int, quality: int) -> bytes:
+    """Synthetic webcam-like frame: smooth gradients plus sensor noise"""
+    xs = np.linspace(0, 255, width, dtype=np.float32)
+    ys = np.linspace(0, 255, height, dtype=np.float32)
+    frame = np.empty((height, width, 3), dtype=np.float32)
+    frame[..., 0] = xs[np.newaxis, :]
+    frame[..., 1] = ys[:, np.newaxis]
+    frame[..., 2] = (xs[np.newaxis, :] + ys[:, np.newaxis]) / 2
+    frame += np.random.default_rng(0).normal(0, 12, frame.shape)
+    cv2.circle(frame, (width // 2, height // 2), height // 4, (200, 180, 160), -1)
+
+    ok, jpeg = cv2.imencode(".jpg", np.clip(frame, 0, 255).astype(np.uint8),
+                            [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("Could not encode test frame")
+    return jpeg.tobytes()
+
+
+def old_path(data_url: str) -> np.ndarray:
+    """base64_to_image followed by the grayscale conversion analyze_frame used to do"""
+    b64 = data_url.split(',')[1]
+    image = Image.open(BytesIO(base64.b64decode(b64)))
+    img_bgr = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    return cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+
+
+def new_path_base64(data_url: str, scale: int) -> np.ndarray:
+    buf = base64.b64decode(data_url.split(',')[1])
+    return cv2.imdecode(np.frombuffer(buf, dtype=np.uint8), DECODE_FLAGS[scale])
+
+
+def new_path_binary(message: bytes, scale: int) -> np.ndarray:
+    payload = memoryview(message)[9:]
+    return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), DECODE_FLAGS[scale])
+
+
+def measure(label: str, fn, iterations: int):
+    fn()  # warm up codecs and caches
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_frame_ms = (time.perf_counter() - start) / iterations * 1000
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = fn()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "lineno")
+    allocated = sum(s.size_diff for s in stats if s.size_diff > 0)
+    blocks = sum(s.count_diff for s in stats if s.count_diff > 0)
+
+    print(f"{label:<34} {per_frame_ms:8.2f} ms/frame   peak {peak / 1024:8.1f} KiB   "
+          f"retained {allocated / 1024:8.1f} KiB in {blocks} blocks   output {result.shape}")
+
+
+def run(image_path: str, width: int, height: int, quality: int, iterations: int):
+    if image_path:
+        with open(image_path, "rb") as f:
+            jpeg = f.read()
+    else:
+        jpeg = make_test_jpeg(width, height, quality)
+
+    data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode()
+    message = bytes(9) + jpeg
+
+    print(f"JPEG size: {len(jpeg) / 1024:.1f} KiB, as base64 JSON: {len(data_url) / 1024:.1f} KiB\n")
+
+    measure("old: base64 + PIL + 2x cvtColor", lambda: old_path(data_url), iterations)
+    for scale in (1, 2, 4):
+        measure(f"new: base64 + imdecode 1/{scale}", lambda: new_path_base64(data_url, scale), iterations)
+    for scale in (1, 2, 4):
+        measure(f"new: binary + imdecode 1/{scale}", lambda: new_path_binary(message, scale), iterations)
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--image", help="JPEG to decode (default: synthetic frame)")
+    p.add_argument("--width", type=int, default=1280, help="Synthetic frame width")
+    p.add_argument("--height", type=int, default=720, help="Synthetic frame height")
+    p.add_argument("--quality", type=int, default=60, help="Synthetic JPEG quality (browser sends 0.6)")
+    p.add_argument("--iterations", type=int, default=100)
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.image, args.width, args.height, args.quality, args.iterations)
@@ -0,0 +1,97 @@
+import argparse
+import io
+import time
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+from app.services.voice_analysis_service import VoiceAnalysisService
+
+# Benchmark for post-recording voice analysis latency.
+#
+# Generates speech-like recordings (voiced segments with a wandering pitch,
+# separated by pauses), then times the pitch extraction step with the old
+# per-frame Python loop against the vectorized version, and the full
+# analyze_audio call used to build the report.
+#
+#   cd backend && python -m tests.bench_voice_analysis --minutes 1 5 15
+
+
+def make_recording(minutes: float, sample_rate: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    n = int(minutes * 60 * sample_rate)
+    t = np.arange(n, dtype=np.float32) / sample_rate
+
+    # Pitch drifts around 150 Hz, with 2-4 second phrases and short pauses
+    f0 = 150 + 30 * np.sin(2 * np.pi * 0.2 * t) + 10 * np.sin(2 * np.pi * 1.3 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6)).astype(np.float32)
+
+    envelope = np.zeros(n, dtype=np.float32)
+    pos = 0
+    while pos < n:
+        phrase = int(rng.uniform(2, 4) * sample_rate)
+        envelope[pos:pos + phrase] = rng.uniform(0.05, 0.2)
+        pos += phrase + int(rng.uniform(0.3, 1.0) * sample_rate)
+
+    return voice * envelope + rng.normal(0, 0.005, n).astype(np.float32)
+
+
+def loop_pitch_values(pitches: np.ndarray, magnitudes: np.ndarray) -> np.ndarray:
+    """The per-frame extraction analyze_audio used before it was vectorized"""
+    pitch_values = []
+    for t in range(pitches.shape[1]):
+        index = magnitudes[:, t].argmax()
+        pitch = pitches[index, t]
+        if pitch > 0:
+            pitch_values.append(pitch)
+    return np.array(pitch_values, dtype=np.float32)
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(minutes_list, sample_rate: int, repeat: int):
+    service = VoiceAnalysisService()
+    print(f"Sample rate: {sample_rate} Hz, best of {repeat}\n")
+    print(f"{'length':>8} {'pitch loop':>12} {'vectorized':>12} {'speedup':>8} {'analyze_audio':>14}")
+
+    for minutes in minutes_list:
+        y = make_recording(minutes, sample_rate)
+        pitches, magnitudes = librosa.piptrack(y=y, sr=sample_rate)
+
+        loop_time, loop_values = timed(lambda: loop_pitch_values(pitches, magnitudes), repeat)
+        vec_time, vec_values = timed(lambda: service._extract_pitch_values(pitches, magnitudes), repeat)
+        assert np.allclose(loop_values, vec_values)
+        del pitches, magnitudes
+
+        wav = io.BytesIO()
+        sf.write(wav, y, sample_rate, format="WAV")
+        audio_bytes = wav.getvalue()
+        del y, wav
+
+        report_time, _ = timed(lambda: service.analyze_audio(audio_bytes), repeat)
+
+        print(f"{minutes:>6g} m {loop_time * 1000:>10.1f}ms {vec_time * 1000:>10.1f}ms "
+              f"{loop_time / vec_time:>7.0f}x {report_time:>12.2f}s")
+
+
+def parse_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--minutes", type=float, nargs="+", default=[1, 5, 15], help="Recording lengths to test")
+    p.add_argument("--sample-rate", type=int, default=16000, help="Sample rate of the generated recordings")
+    p.add_argument("--repeat", type=int, default=1, help="Runs per measurement (best is reported)")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.minutes, args.sample_rate, args.repeat)
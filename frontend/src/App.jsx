@@ -5,7 +5,7 @@ import Chatbox  from './components/Chatbox';
 import Toolbar  from './components/Toolbar';
 
 export default function App() {
-    const { connected, error, startRecording, stopRecording, sendAudio } = useWS();
+    const { connected, error, startRecording, stopRecording } = useWS();
 
     const [recording, setRecording] = useState(false);
     const [cameraOn, setCameraOn]   = useState(true);
@@ -23,7 +23,7 @@ export default function App() {
     /* handlers */
     const handleRecord = useCallback(() => { setRecording(true);  startRecording(); }, [startRecording]);
     const handleStop   = useCallback(() => { setRecording(false); }, []);
-    const handleAudio  = useCallback((b64) => { sendAudio(b64); stopRecording(); }, [sendAudio, stopRecording]);
+    const handleAudio  = useCallback(() => stopRecording(), [stopRecording]);
 
     return (
         <div className="app">
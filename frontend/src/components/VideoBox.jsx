@@ -2,17 +2,35 @@ import { useRef, useEffect, useState } from 'react';
 import { useWS } from '../context/WebSocketContext';
 import { FaVideoSlash } from 'react-icons/fa';
 
+const PCM_RATE = 16000;   // live audio is downsampled to roughly this rate
+
+/* average `factor` float samples into one 16-bit sample */
+function toPcm16(input, factor) {
+    const out = new Int16Array(Math.floor(input.length / factor));
+    for (let i = 0; i < out.length; i++) {
+        let sum = 0;
+        for (let j = 0; j < factor; j++) sum += input[i * factor + j];
+        const v = Math.max(-1, Math.min(1, sum / factor));
+        out[i] = v < 0 ? v * 0x8000 : v * 0x7fff;
+    }
+    return out;
+}
+
 export default function VideoBox({ isRecording, cameraOn, muted, onAudioReady }) {
-    const { sendFrame, emotion, connected, FRAME_MS } = useWS();
+    const { sendFrame, sendPcm, sendAudio, emotion, voice, connected, FRAME_MS } = useWS();
     const videoRef   = useRef(null);
     const canvasRef  = useRef(null);
     const streamRef  = useRef(null);
     const recRef     = useRef(null);
-    const chunksRef  = useRef([]);
+    const pcmRef     = useRef(null);
+    const pcmCb      = useRef(sendPcm);
+    const audioCb    = useRef(sendAudio);
     const cbRef      = useRef(onAudioReady);
     const [ready, setReady]      = useState(false);
     const [camErr, setCamErr]    = useState(null);
     cbRef.current = onAudioReady;
+    pcmCb.current = sendPcm;
+    audioCb.current = sendAudio;
 
     /* ── get stream ──────────────────────────────── */
     useEffect(() => {
@@ -44,7 +62,7 @@ export default function VideoBox({ isRecording, cameraOn, muted, onAudioReady })
             const ctx = c.getContext('2d');
             c.width = v.videoWidth; c.height = v.videoHeight;
             ctx.drawImage(v, 0, 0);
-            sendFrame(c.toDataURL('image/jpeg', 0.6));
+            c.toBlob(b => b && sendFrame(b), 'image/jpeg', 0.6);
         }, FRAME_MS);
         return () => clearInterval(id);
     }, [FRAME_MS, sendFrame, cameraOn, connected]);
@@ -55,21 +73,30 @@ export default function VideoBox({ isRecording, cameraOn, muted, onAudioReady })
         if (isRecording) {
             const as = new MediaStream(streamRef.current.getAudioTracks());
             const mime = MediaRecorder.isTypeSupported('audio/webm;codecs=opus') ? 'audio/webm;codecs=opus' : 'audio/webm';
-            chunksRef.current = [];
             const r = new MediaRecorder(as, { mimeType: mime });
-            r.ondataavailable = (e) => { if (e.data.size) chunksRef.current.push(e.data); };
-            r.onstop = () => {
-                const blob = new Blob(chunksRef.current, { type: mime });
-                const rd = new FileReader();
-                rd.onloadend = () => cbRef.current?.(rd.result);
-                rd.readAsDataURL(blob);
-            };
+            // upload each chunk as it is recorded; the server appends them
+            r.ondataavailable = (e) => { if (e.data.size) audioCb.current?.(e.data); };
+            r.onstop = () => cbRef.current?.();
             r.start(1000);
             recRef.current = r;
+
+            // stream raw PCM too so the server can analyze the voice while we record
+            const ctx  = new AudioContext();
+            const src  = ctx.createMediaStreamSource(as);
+            const proc = ctx.createScriptProcessor(4096, 1, 1);
+            const factor = Math.max(1, Math.round(ctx.sampleRate / PCM_RATE));
+            proc.onaudioprocess = (e) => pcmCb.current?.(toPcm16(e.inputBuffer.getChannelData(0), factor), Math.round(ctx.sampleRate / factor));
+            src.connect(proc); proc.connect(ctx.destination);
+            pcmRef.current = { ctx, src, proc };
         } else if (recRef.current?.state === 'recording') {
             recRef.current.stop();
             recRef.current = null;
         }
+        if (!isRecording && pcmRef.current) {
+            const { ctx, src, proc } = pcmRef.current;
+            proc.disconnect(); src.disconnect(); ctx.close();
+            pcmRef.current = null;
+        }
     }, [isRecording, ready]);
 
     const dom = emotion?.dominant_emotion;
@@ -115,6 +142,14 @@ export default function VideoBox({ isRecording, cameraOn, muted, onAudioReady })
                     {conf != null && <div className="conf">{(conf * 100).toFixed(0)}%</div>}
                 </div>
             )}
+
+            {/* live voice tone while recording */}
+            {isRecording && voice?.tone && (
+                <div className="video-overlay voice-chip">
+                    <div className="label">{voice.tone}</div>
+                    {voice.confidence_score != null && <div className="conf">Confidence {Math.round(voice.confidence_score)}</div>}
+                </div>
+            )}
         </div>
     );
 }
@@ -11,6 +11,38 @@ const WS_BASE = getWsBase();
 const SID = 'user-' + Math.random().toString(36).slice(2, 9);
 const WS_URL = `${WS_BASE}/ws/${SID}`;
 const FRAME_MS = 1000;
+const BUSY_TIMEOUT_MS = 5000;   // stop waiting for a lost result after this long
+
+/* binary messages: 1-byte type + float64 LE timestamp, then raw payload */
+const BIN_FRAME = 1;
+const BIN_AUDIO = 2;
+const BIN_PCM   = 3;   // payload: uint32 LE sample rate + int16 LE mono samples
+/* one-line chat notes for each report piece that arrives before the feedback */
+const PARTIAL_NOTES = {
+    speech:          d => `Speech: ${d.speech_analysis?.word_count ?? 0} words at ${d.speech_analysis?.words_per_minute ?? 0} wpm`,
+    voice:           d => `Voice: ${d.tone_description}`,
+    emotion_summary: d => `Mostly ${d.emotion_summary?.emotion_summary?.dominant ?? 'neutral'} on camera`,
+    score:           d => `Overall score: ${Math.round(d.overall_score)}/100`,
+};
+
+/* append streamed feedback text to the reply being written, or start one */
+function appendStreaming(chat, delta) {
+    const last = chat[chat.length - 1];
+    if (last?.streaming) return [...chat.slice(0, -1), { ...last, content: last.content + delta }];
+    return [...chat, { role: 'assistant', content: delta, streaming: true }];
+}
+function finishStreaming(chat, content) {
+    const last = chat[chat.length - 1];
+    if (last?.streaming) return [...chat.slice(0, -1), { role: 'assistant', content: content || last.content }];
+    return [...chat, { role: 'assistant', content: content || 'Analysis complete.' }];
+}
+
+function binaryHeader(kind) {
+    const header = new DataView(new ArrayBuffer(9));
+    header.setUint8(0, kind);
+    header.setFloat64(1, Date.now() / 1000, true);
+    return header.buffer;
+}
 
 export function WebSocketProvider({ children }) {
     const [connected, setConnected]     = useState(false);
@@ -19,8 +51,11 @@ export function WebSocketProvider({ children }) {
     const [topic, setTopic]             = useState(null);
     const [processing, setProcessing]   = useState(false);
     const [error, setError]             = useState(null);
+    const [frameMs, setFrameMs]         = useState(FRAME_MS);
+    const [voice, setVoice]             = useState(null);
     const ws   = useRef(null);
     const reco = useRef(null);
+    const busy = useRef({ drop: false, since: 0 });   // server-requested frame dropping
 
     /* ── connect ─────────────────────────────────── */
     const connect = useCallback(() => {
@@ -33,14 +68,24 @@ export function WebSocketProvider({ children }) {
         ws.current.onmessage = (e) => {
             let m; try { m = JSON.parse(e.data); } catch { return; }
             switch (m.type) {
-                case 'emotion_update':    setEmotion(m.data); break;
+                case 'emotion_update':    busy.current.since = 0; setEmotion(m.data); break;
+                case 'frame_rate':
+                    busy.current.drop = !!m.drop_while_busy;
+                    if (m.interval > 0) setFrameMs(Math.round(m.interval * 1000)); break;
+                case 'voice_update':      setVoice({ ...m.data, tone: m.tone_description }); break;
                 case 'topic_assigned':    setTopic(m.topic); break;
-                case 'recording_started': break;
+                case 'recording_started': setVoice(null); break;
                 case 'recording_stopped': setProcessing(true);
                     setChat(p => [...p, { role: 'system', content: 'Analyzing your performance...' }]); break;
+                case 'analysis_partial':
+                    if (m.stage === 'feedback') { setChat(p => appendStreaming(p, m.delta)); break; }
+                    if (PARTIAL_NOTES[m.stage]) setChat(p => [...p, { role: 'system', content: PARTIAL_NOTES[m.stage](m.data) }]);
+                    break;
                 case 'analysis_complete':
                     setProcessing(false);
-                    setChat(p => [...p, { role: 'assistant', content: m.results?.feedback || 'Analysis complete.' }]); break;
+                    setChat(p => finishStreaming(p, m.results?.feedback)); break;
+                case 'analysis_failed':
+                    setProcessing(false); setError(m.message); break;
                 case 'chat_response':
                     setChat(p => [...p, { role: 'assistant', content: m.message }]); break;
                 case 'error': setError(m.message); break;
@@ -66,16 +111,34 @@ export function WebSocketProvider({ children }) {
         return true;
     }, []);
 
-    const sendFrame      = useCallback((b64) => send({ type: 'frame', data: b64, timestamp: Date.now() / 1000 }), [send]);
+    const sendBinary = useCallback((kind, blob) => {
+        if (ws.current?.readyState !== WebSocket.OPEN) return false;
+        ws.current.send(new Blob([binaryHeader(kind), blob]));
+        return true;
+    }, []);
+
+    const sendFrame      = useCallback((jpeg) => {
+        // While the server is still analyzing our last frame, skip this one
+        const b = busy.current, now = Date.now();
+        if (b.drop && b.since && now - b.since < BUSY_TIMEOUT_MS) return false;
+        if (!sendBinary(BIN_FRAME, jpeg)) return false;
+        b.since = now;
+        return true;
+    }, [sendBinary]);
     const sendChat       = useCallback((txt) => { setChat(p => [...p, { role: 'user', content: txt }]); send({ type: 'chat', message: txt }); }, [send]);
     const startRecording = useCallback(() => send({ type: 'start_recording' }), [send]);
     const stopRecording  = useCallback(() => send({ type: 'stop_recording' }),  [send]);
-    const sendAudio      = useCallback((b64) => send({ type: 'audio_complete', data: b64 }), [send]);
+    const sendAudio      = useCallback((blob) => sendBinary(BIN_AUDIO, blob), [sendBinary]);
+    const sendPcm        = useCallback((samples, rate) => {
+        const head = new DataView(new ArrayBuffer(4));
+        head.setUint32(0, rate, true);
+        return sendBinary(BIN_PCM, new Blob([head.buffer, samples.buffer]));
+    }, [sendBinary]);
     const newTopic       = useCallback(() => send({ type: 'request_new_topic' }), [send]);
 
     return (
-        <Ctx.Provider value={{ connected, emotion, chat, topic, processing, error,
-            sendFrame, sendChat, startRecording, stopRecording, sendAudio, newTopic, FRAME_MS }}>
+        <Ctx.Provider value={{ connected, emotion, voice, chat, topic, processing, error,
+            sendFrame, sendChat, startRecording, stopRecording, sendAudio, sendPcm, newTopic, FRAME_MS: frameMs }}>
             {children}
         </Ctx.Provider>
     );